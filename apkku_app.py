@@ -1,8 +1,6 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import griddata
+import warmup
 
 # ===========================
 # STREAMLIT UI
@@ -13,7 +11,16 @@ st.write("Upload file CSV berisi kolom X, Y, Value")
 # Upload CSV
 file = st.file_uploader("Upload CSV", type=["csv"])
 
+# Opsional (CALLISTA_WARMUP=1): import modul berat di latar belakang
+warmup.start()
+
 if file is not None:
+    # Import modul berat ditunda sampai ada file
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    from scipy.interpolate import griddata
+    from despike_ui import qc_spike_section
+
     # Membaca CSV
     data = pd.read_csv(file)
     st.subheader("Data Asli")
@@ -27,6 +34,14 @@ if file is not None:
         y = data['Y'].values
         z = data['Value'].values
 
+        # =======================
+        # QC Spike (sebelum gridding)
+        # =======================
+        spikes, qc_mode = qc_spike_section(data, x, y, z)
+        spike_x, spike_y = x[spikes], y[spikes]
+        if qc_mode == "Buang":
+            x, y, z = x[~spikes], y[~spikes], z[~spikes]
+
         # Membuat grid interpolasi
         grid_x, grid_y = np.mgrid[min(x):max(x):200j, min(y):max(y):200j]
         grid_z = griddata((x, y), z, (grid_x, grid_y), method='cubic')
@@ -38,6 +53,8 @@ if file is not None:
         fig1, ax1 = plt.subplots()
         kontur = ax1.contourf(grid_x, grid_y, grid_z, 20)
         plt.scatter(x, y, c='k', s=10, label="Titik Data")
+        if len(spike_x):
+            plt.scatter(spike_x, spike_y, c='r', marker='x', s=30, label="Spike (QC)")
         plt.colorbar(kontur, ax=ax1, label="Nilai Anomali")
         plt.legend()
         st.pyplot(fig1)
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+# Anggaran memori global untuk semua sesi dalam satu proses server (MB)
+BUDGET_MB = float(os.environ.get("CALLISTA_STORE_MB", "512"))
+
+
+class ArrayHandle:
+    # Yang disimpan di st.session_state: hanya kunci + metadata kecil, bukan array-nya.
+    # Saat handle dibuang (sesi ditutup / nilai diganti), referensinya dilepas otomatis
+    __slots__ = ("key", "shape", "dtype", "index", "__weakref__")
+
+    def __init__(self, key, shape, dtype, index=None):
+        self.key = key
+        self.shape = shape
+        self.dtype = dtype
+        self.index = index
+
+    def __repr__(self):
+        return f"ArrayHandle({self.key[:12]}, shape={self.shape}, dtype={self.dtype})"
+
+
+class _Entry:
+    __slots__ = ("array", "nbytes", "refs")
+
+    def __init__(self, array):
+        self.array = array
+        self.nbytes = array.nbytes
+        self.refs = 0
+
+
+class ArrayStore:
+    # Penyimpanan array bersama untuk seluruh proses: isi yang sama (hash) hanya disimpan
+    # sekali, dihitung referensinya per handle, dan dibatasi anggaran memori. Kalau anggaran
+    # terlampaui, entri tanpa handle dibuang dulu (LRU); baru kalau masih kurang, entri yang
+    # masih dipakai ikut dibuang dan handle-nya mengembalikan None (app menghitung ulang)
+
+    def __init__(self, budget_bytes):
+        self.budget = int(budget_bytes)
+        self._entries = OrderedDict()  # urutan = LRU, paling lama dipakai di depan
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def content_key(arr):
+        arr = np.ascontiguousarray(arr)
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{arr.dtype.str}{arr.shape}".encode())
+        h.update(arr.data)
+        return h.hexdigest()
+
+    def put(self, arr, key=None):
+        # Array dianggap tidak berubah setelah disimpan (dikembalikan read-only).
+        # key opsional untuk hasil turunan, mis. f"grid:{key_survei}:100:linear"
+        arr = np.asarray(arr)
+        key = key or self.content_key(arr)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+                arr = np.ascontiguousarray(arr).view()
+                arr.setflags(write=False)
+                entry = self._entries[key] = _Entry(arr)
+                self._bytes += entry.nbytes
+                self._evict(keep=key)
+            return self._handle(key, entry)
+
+    def lookup(self, key, index=None):
+        # Handle untuk kunci yang sudah ada, atau None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._handle(key, entry, index)
+
+    def view(self, handle, index):
+        # Handle ke potongan array yang sama (mis. satu kolom) tanpa menyalin data
+        return self.lookup(handle.key, index)
+
+    def get(self, handle):
+        if handle is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(handle.key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(handle.key)
+        return entry.array if handle.index is None else entry.array[handle.index]
+
+    def _handle(self, key, entry, index=None):
+        arr = entry.array if index is None else entry.array[index]
+        handle = ArrayHandle(key, arr.shape, arr.dtype, index)
+        entry.refs += 1
+        weakref.finalize(handle, self._release, entry)
+        return handle
+
+    def _release(self, entry):
+        # Dipanggil oleh finalizer; entri yang sudah dibuang tidak berpengaruh lagi
+        with self._lock:
+            entry.refs -= 1
+
+    def _evict(self, keep):
+        for referenced in (False, True):
+            for key in [k for k, e in self._entries.items() if (e.refs > 0) == referenced and k != keep]:
+                if self._bytes <= self.budget:
+                    return
+                self._bytes -= self._entries.pop(key).nbytes
+                self.evictions += 1
+
+    def usage(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget,
+                "handles": sum(e.refs for e in self._entries.values()),
+                "unreferenced": sum(e.refs == 0 for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+STORE = ArrayStore(BUDGET_MB * 2**20)
@@ -1,23 +1,67 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import griddata
 import io
 import zipfile
+import warmup
+from instrumentasi import StageTimer
+from survey_io import SURVEY_TYPES
 
 st.set_page_config(layout="wide", page_title="Pemetaan Medan Potensial")
 st.title("Aplikasi Pemetaan Medan Potensial - Kontur & Heatmap")
-st.write("Upload CSV berisi kolom: X, Y, Value (separator koma).")
+st.write("Upload CSV (separator koma), Parquet, Feather/Arrow atau NPZ berisi kolom: X, Y, Value.")
+
+uploaded_file = st.file_uploader("Upload file survei", type=SURVEY_TYPES) 
+
+# Opsional (CALLISTA_WARMUP=1): import modul berat di latar belakang sejak sesi pertama
+warmup.start()
+
+
+# Mask dihitung sekali per survei + geometri grid, lalu dipakai ulang di setiap rerun
+@st.cache_data(max_entries=8)
+def cached_mask(points, XI, YI, kind, max_dist):
+    return build_mask(points, XI, YI, kind == 'Concave hull', max_dist)
+
+
+# Fit trend regional disimpan di cache: jutaan titik + IRLS tidak diulang tiap rerun
+@st.cache_data(max_entries=8)
+def cached_trend(x, y, val, order, robust):
+    trend = fit_trend(x, y, val, order=order, robust=robust)
+    resid = val - evaluate_points(trend, x, y)
+    return trend, resid, float(np.sqrt(np.nanmean(resid ** 2)))
 
-uploaded_file = st.file_uploader("Upload file CSV", type=["csv"]) 
 
 if uploaded_file is not None:
+    timer = StageTimer("callista")
+
+
+    # IMPORT MODUL BERAT: ditunda sampai ada file, supaya halaman pertama cepat tampil
+
+    with timer.stage("import"):
+        import pandas as pd
+        import matplotlib.pyplot as plt
+        from survey_io import ColumnError, read_survey
+        from profil import parse_polylines, polylines_from_table, extract_profiles, profiles_kml
+        from grid_mask import build_mask, interpolate_masked
+        from trend import fit_trend, evaluate_points, evaluate_grid
+        from mesh3d import build_mesh, to_glb, to_obj
+        from grid_io import GRID_FORMATS, write_grid
+        from despike_ui import cached_despike
+
+
+    # BACA DATA: hanya kolom X, Y, VALUE yang dibaca
+
     try:
-        df = pd.read_csv(uploaded_file)
+        with timer.stage("baca_data"):
+            x, y, val, line, (xi, yi, vi) = read_survey(uploaded_file, line=True)
+            if line is not None:
+                line = pd.factorize(line)[0]
+    except ColumnError:
+        st.error('File harus punya kolom X, Y, dan Value.')
+        st.stop()
     except Exception as e:
-        st.error(f"Gagal membaca CSV: {e}")
+        st.error(f"Gagal membaca file: {e}")
         st.stop()
+    df = pd.DataFrame({xi: x, yi: y, vi: val}, copy=False)
 
 
     # TAMPILKAN TABEL DATA SURVEI
@@ -27,21 +71,6 @@ if uploaded_file is not None:
     st.write(f"Jumlah data: {len(df)} titik pengukuran")
 
 
-    # CEK KOLOM X, Y, VALUE
-
-    try:
-        xi = [c for c in df.columns if c.lower().startswith('x')][0]
-        yi = [c for c in df.columns if c.lower().startswith('y')][0]
-        vi = [c for c in df.columns if (c.lower().startswith('v') or c.lower().startswith('value') or c.lower().startswith('z'))][0]
-    except Exception:
-        st.error('CSV harus punya kolom X, Y, dan Value.')
-        st.stop()
-
-    x = df[xi].astype(float).values
-    y = df[yi].astype(float).values
-    val = df[vi].astype(float).values
-
-
     # PENGATURAN INTERPOLASI
 
     col1, col2 = st.columns([1,3])
@@ -50,6 +79,63 @@ if uploaded_file is not None:
         method = st.selectbox('Metode interpolasi', ['linear', 'cubic', 'nearest'])
         show_contour = st.checkbox('Tampilkan kontur', value=True)
         show_heatmap = st.checkbox('Tampilkan heatmap', value=True)
+        layer = st.selectbox('Layer yang digrid', ['Nilai', 'Residual', 'Regional'])
+        if layer != 'Nilai':
+            trend_order = st.slider('Orde trend polinomial', 1, 6, 1)
+            trend_robust = st.checkbox('Fit robust (IRLS)', value=False)
+        qc_mode = st.selectbox('QC spike sebelum gridding', ['Tidak ada', 'Tandai', 'Buang'])
+        if qc_mode != 'Tidak ada':
+            qc_method = st.selectbox('Metode QC', ['knn'] + (['line'] if line is not None else []),
+                                     format_func=lambda m: 'Median k tetangga (KD-tree)' if m == 'knn' else 'Median bergerak per lintasan')
+            if qc_method == 'knn':
+                qc_k, qc_window = st.slider('Jumlah tetangga', 8, 64, 24), 15
+            else:
+                qc_k, qc_window = 24, st.slider('Lebar jendela (titik)', 3, 51, 15, step=2)
+            qc_threshold = st.number_input('Ambang skor (kelipatan MAD)', min_value=1.0, value=5.0, step=0.5)
+        mask_kind = st.selectbox('Mask sel jauh dari data', ['Tidak ada', 'Jarak KD-tree', 'Concave hull'])
+        if mask_kind != 'Tidak ada':
+            max_dist = st.number_input('Jarak maks ke stasiun / sisi hull (0 = otomatis)', min_value=0.0, value=0.0, format="%g")
+
+        with st.expander('Profil penampang'):
+            profile_text = st.text_area('Satu profil per baris: x1,y1; x2,y2; ...', '')
+            profile_file = st.file_uploader('atau CSV titik sudut (kolom: Profil, X, Y)', type=["csv"])
+            profile_step = st.number_input('Jarak sampel (0 = 1 sel grid)', min_value=0.0, value=0.0, format="%g")
+            profile_order = st.selectbox('Sampling', [1, 3], format_func=lambda o: 'Bilinear' if o == 1 else 'Bikubik')
+
+        grid_format = st.selectbox('Format ekspor grid', list(GRID_FORMATS), format_func=GRID_FORMATS.get)
+
+        with st.expander('Mesh 3-D (glTF / OBJ)'):
+            make_mesh = st.checkbox('Buat mesh 3-D', value=False)
+            mesh_tol = st.number_input('Toleransi error (0 = 0,5% rentang nilai)', min_value=0.0, value=0.0, format="%g")
+            mesh_exag = st.slider('Tinggi relief (% lebar area)', 1, 100, 20)
+            mesh_format = st.selectbox('Format mesh', ['glTF biner (.glb)', 'OBJ'])
+        try:
+            polylines = parse_polylines(profile_text)
+            if profile_file is not None:
+                polylines += polylines_from_table(pd.read_csv(profile_file))
+        except Exception as e:
+            st.error(f"Profil tidak bisa dibaca: {e}")
+            polylines = []
+
+
+    # QC SPIKE: tiap stasiun dibandingkan dengan median/MAD tetangganya sebelum gridding
+
+    spikes = np.zeros(len(x), dtype=bool)
+    if qc_mode != 'Tidak ada':
+        with timer.stage("qc_despike", points=len(x)):
+            qc = cached_despike(x, y, val, line, qc_method, qc_k, qc_window, qc_threshold)
+        spikes = qc['flag']
+        with col1:
+            st.caption(f"QC: {spikes.sum()} titik terdeteksi spike ({100 * spikes.mean():.2f}%)")
+        if spikes.any():
+            with st.expander(f"Titik yang {'dibuang' if qc_mode == 'Buang' else 'ditandai'} QC ({spikes.sum()})"):
+                st.dataframe(pd.DataFrame({
+                    xi: x[spikes], yi: y[spikes], vi: val[spikes],
+                    'Median tetangga': qc['median'][spikes], 'Skor': qc['score'][spikes],
+                }).sort_values('Skor', ascending=False), use_container_width=True)
+    spike_x, spike_y = x[spikes], y[spikes]
+    if qc_mode == 'Buang':
+        x, y, val = x[~spikes], y[~spikes], val[~spikes]
 
 
     # BUAT GRID
@@ -62,12 +148,55 @@ if uploaded_file is not None:
     points = np.column_stack((x, y))
 
 
-    # INTERPOLASI
+    # MASK SEL YANG JAUH DARI STASIUN
+
+    if mask_kind == 'Tidak ada':
+        mask = np.ones(XI.shape, dtype=bool)
+    else:
+        with timer.stage("mask", points=len(x), grid=XI.shape):
+            mask, used_hull = cached_mask(points, XI, YI, mask_kind, max_dist)
+        with col1:
+            if mask_kind == 'Concave hull' and not used_hull:
+                st.warning('Concave hull tidak bisa dibuat (stasiun segaris/degenerate); dipakai mask jarak KD-tree.')
+            st.caption(f"Sel diinterpolasi: {mask.sum()} dari {mask.size} ({100 * mask.mean():.0f}%)")
+        if not mask.any():
+            st.error('Semua sel ter-mask. Perbesar jarak maks.')
+            st.stop()
 
-    try:
-        ZI = griddata(points, val, (XI, YI), method=method)
-    except:
-        ZI = griddata(points, val, (XI, YI), method='nearest')
+
+    # PEMISAHAN REGIONAL-RESIDUAL: trend difit di titik, residual = nilai - trend di tiap
+    # stasiun, lalu residual itu yang digrid
+
+    grid_val = val
+    if layer != 'Nilai':
+        with timer.stage("trend", points=len(x)):
+            trend, trend_resid, trend_rms = cached_trend(x, y, val, trend_order, trend_robust)
+        if layer == 'Residual':
+            grid_val = trend_resid
+        with col1:
+            st.caption(f"RMS residual di titik: {trend_rms:.4g}")
+
+
+    # INTERPOLASI (hanya sel di dalam mask)
+
+    with timer.stage("griddata", points=len(x), grid=XI.shape):
+        try:
+            ZI = interpolate_masked(points, grid_val, XI, YI, mask, method=method)
+        except:
+            ZI = interpolate_masked(points, grid_val, XI, YI, mask, method='nearest')
+
+    # Layer regional: trend dievaluasi langsung di grid, dengan cakupan (mask/hull) yang sama
+    if layer == 'Regional':
+        with timer.stage("trend_grid", grid=ZI.shape):
+            ZI = np.where(np.isnan(ZI), np.nan, evaluate_grid(trend, xi_lin, yi_lin))
+
+
+    # PROFIL PENAMPANG: semua profil disampel dalam satu panggilan map_coordinates
+
+    if polylines:
+        with timer.stage("profil", grid=ZI.shape):
+            profiles = extract_profiles(ZI, (xmin, xmax, ymin, ymax), polylines,
+                                        profile_step or (xmax - xmin) / (res - 1), order=profile_order)
 
 
     # PLOT PETA
@@ -80,28 +209,54 @@ if uploaded_file is not None:
             plt.colorbar(im, ax=ax, label='Value')
 
         if show_contour:
-            try:
-                cs = ax.contour(XI, YI, ZI, 10, linewidths=0.8, colors='black')
-                ax.clabel(cs, inline=True, fontsize=8)
-            except:
-                pass
+            with timer.stage("kontur", points=len(x), grid=ZI.shape):
+                try:
+                    cs = ax.contour(XI, YI, ZI, 10, linewidths=0.8, colors='black')
+                    ax.clabel(cs, inline=True, fontsize=8)
+                except:
+                    pass
 
         ax.scatter(x, y, c='white', s=8, edgecolors='black')
+        if len(spike_x):
+            ax.scatter(spike_x, spike_y, c='red', marker='x', s=30, label='Spike (QC)')
+            ax.legend(loc='upper right', fontsize=8)
+        for pid, poly in enumerate(polylines, start=1):
+            ax.plot(poly[:, 0], poly[:, 1], color='magenta', linewidth=1.2)
+            ax.annotate(str(pid), poly[0], color='magenta', fontsize=8)
         ax.set_xlabel('X')
         ax.set_ylabel('Y')
-        ax.set_title('Peta Medan Potensial')
-
-        st.pyplot(fig)
+        ax.set_title('Peta Medan Potensial' if layer == 'Nilai' else f'Peta Medan Potensial - {layer}')
+
+        with timer.stage("render_plot", points=len(x), grid=ZI.shape):
+            st.pyplot(fig)
+
+        if polylines:
+            st.subheader("Profil Penampang")
+            fig_p, ax_p = plt.subplots(figsize=(8,3))
+            for pid, g in profiles.groupby('Profil'):
+                ax_p.plot(g['Jarak'], g['Value'], linewidth=1, label=f'Profil {pid}')
+            ax_p.set_xlabel('Jarak')
+            ax_p.set_ylabel('Value')
+            if len(polylines) <= 10:
+                ax_p.legend(fontsize=8)
+            st.pyplot(fig_p)
+
+            st.download_button("Download profil (CSV)", profiles.to_csv(index=False).encode('utf-8'),
+                               "profil.csv", mime="text/csv")
+            st.download_button("Download profil (KML LineString)", profiles_kml(profiles).encode('utf-8'),
+                               "profil.kml", mime="application/vnd.google-earth.kml+xml")
 
     
     # SIMPAN HEATMAP PNG
   
+    # NaN (di luar data / sel yang di-mask) dibiarkan transparan
     vmin = np.nanmin(ZI)
-    img = np.flipud(ZI.copy())
-    img = np.nan_to_num(img, nan=vmin)
+    vmax = np.nanmax(ZI)
+    img = np.flipud(ZI)
 
     heat_buf = io.BytesIO()
-    plt.imsave(heat_buf, img, cmap='jet', format='png')
+    with timer.stage("imsave_png", grid=img.shape):
+        plt.imsave(heat_buf, img, cmap='jet', vmin=vmin, vmax=vmax, format='png')
     heat_buf.seek(0)
 
  
@@ -131,9 +286,10 @@ if uploaded_file is not None:
     # BUNGKUS JADI KMZ
   
     kmz_bytes = io.BytesIO()
-    with zipfile.ZipFile(kmz_bytes, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("doc.kml", kml_doc)
-        zf.writestr("heatmap.png", heat_buf.getvalue())
+    with timer.stage("zip_kmz"):
+        with zipfile.ZipFile(kmz_bytes, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("doc.kml", kml_doc)
+            zf.writestr("heatmap.png", heat_buf.getvalue())
     kmz_bytes.seek(0)
 
  
@@ -148,5 +304,42 @@ if uploaded_file is not None:
 
     st.success("Heatmap berhasil dibuat & bisa dibuka di Google Earth!")
 
+
+    # EKSPOR GRID NUMERIK: ditulis per blok baris langsung dari ZI (koordinat = lon/lat seperti KMZ)
+
+    grid_buf = io.BytesIO()
+    with timer.stage(f"ekspor_{grid_format}", grid=ZI.shape):
+        write_grid(grid_buf, ZI, (xmin, xmax, ymin, ymax), grid_format, epsg=4326)
+    st.download_button(
+        f"Download grid {GRID_FORMATS[grid_format]}",
+        grid_buf.getvalue(),
+        f"grid_{layer.lower()}.{grid_format}",
+        mime="application/octet-stream"
+    )
+
+
+    # EKSPOR MESH 3-D: grid didecimate adaptif (error <= toleransi), warna vertex = colormap heatmap
+
+    if make_mesh:
+        with timer.stage("mesh3d", grid=ZI.shape):
+            tol = mesh_tol or 0.005 * (vmax - vmin)
+            z_scale = mesh_exag / 100 * max(xmax - xmin, ymax - ymin) / ((vmax - vmin) or 1.0)
+            positions, values, triangles = build_mesh(ZI, xi_lin, yi_lin, tol, z_scale)
+            colors = plt.get_cmap('jet')((values - vmin) / ((vmax - vmin) or 1.0))
+            if mesh_format == 'OBJ':
+                mesh_bytes, mesh_name, mesh_mime = to_obj(positions, colors, triangles), "grid_mesh.obj", "text/plain"
+            else:
+                mesh_bytes, mesh_name, mesh_mime = to_glb(positions, colors, triangles), "grid_mesh.glb", "model/gltf-binary"
+        st.caption(f"Mesh: {len(triangles)} segitiga dari {2 * (ZI.shape[0] - 1) * (ZI.shape[1] - 1)} (grid penuh), toleransi {tol:.4g}")
+        st.download_button(f"Download mesh 3-D ({mesh_format})", mesh_bytes, mesh_name, mime=mesh_mime)
+
+
+    # PANEL WAKTU PER TAHAP (juga ditulis ke log JSON & file metrik Prometheus)
+
+    timing_rows, timing_total = timer.rows(), timer.total_seconds()
+    timer.flush()
+    with st.expander(f"Waktu per tahap ({timing_total:.2f} s)"):
+        st.dataframe(pd.DataFrame(timing_rows), use_container_width=True)
+
 else:
-    st.info("Silakan upload file CSV untuk memulai.")
+    st.info("Silakan upload file survei untuk memulai.")
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from despike import despike
+from survey_io import detect_line_column
+
+
+# QC spike disimpan di cache: query KD-tree / median lintasan tidak diulang tiap ganti widget
+@st.cache_data(max_entries=8)
+def cached_despike(x, y, val, line, method, k, window, threshold):
+    return despike(x, y, val, line=line, method=method, k=k, window=window, threshold=threshold)
+
+
+def qc_spike_section(data, x, y, z):
+    # Widget QC spike untuk app CSV sederhana: median per lintasan kalau ada kolom lintasan,
+    # selain itu median k tetangga. Kembalikan (flag spike, mode 'Tidak ada'/'Tandai'/'Buang')
+    qc_mode = st.selectbox("QC spike", ["Tidak ada", "Tandai", "Buang"])
+    spikes = np.zeros(len(z), dtype=bool)
+    if qc_mode == "Tidak ada":
+        return spikes, qc_mode
+    line_col = detect_line_column(data.columns)
+    qc_threshold = st.number_input("Ambang skor (kelipatan MAD)", min_value=1.0, value=5.0, step=0.5)
+    line = None if line_col is None else pd.factorize(data[line_col])[0]
+    qc = cached_despike(np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(z, dtype=float),
+                        line, 'knn' if line is None else 'line', 24, 15, qc_threshold)
+    spikes = qc['flag']
+    st.write(f"QC ({'k tetangga' if line_col is None else 'median per lintasan ' + line_col}): "
+             f"{spikes.sum()} titik spike {'dibuang' if qc_mode == 'Buang' else 'ditandai'}")
+    if spikes.any():
+        st.dataframe(data[spikes].assign(Median=qc['median'][spikes], Skor=qc['score'][spikes]))
+    return spikes, qc_mode
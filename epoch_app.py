@@ -0,0 +1,198 @@
+import streamlit as st
+import numpy as np
+import io
+import os
+import zipfile
+from xml.sax.saxutils import escape
+import warmup
+from instrumentasi import StageTimer
+from survey_io import SURVEY_TYPES
+
+st.set_page_config(layout="wide", page_title="Selisih Multi-Epoch")
+st.title("Aplikasi Selisih Multi-Epoch - Survei Time-Lapse")
+st.write("Upload beberapa file (CSV, Parquet, Feather/Arrow atau NPZ; satu per epoch) berisi kolom: X, Y, Value. Urutan epoch mengikuti nama file.")
+
+uploaded_files = st.file_uploader("Upload file survei tiap epoch", type=SURVEY_TYPES, accept_multiple_files=True)
+
+# Opsional (CALLISTA_WARMUP=1): import modul berat di latar belakang sejak sesi pertama
+warmup.start()
+
+
+# Interpolator per epoch disimpan di cache, jadi tidak dibangun ulang
+# saat resolusi / referensi selisih diubah
+@st.cache_resource(max_entries=32)
+def cached_interpolator(points, values, method):
+    return build_interpolator(points, values, method)
+
+
+def save_overlay_png(grid, vmin, vmax, cmap):
+    # NaN otomatis transparan (warna "bad" colormap)
+    buf = io.BytesIO()
+    plt.imsave(buf, np.flipud(grid), cmap=cmap, vmin=vmin, vmax=vmax, format='png')
+    return buf.getvalue()
+
+
+if uploaded_files and len(uploaded_files) >= 2:
+    timer = StageTimer("epoch")
+
+    # IMPORT MODUL BERAT: ditunda sampai ada file
+
+    with timer.stage("import"):
+        import pandas as pd
+        import matplotlib.pyplot as plt
+        from epoch_grid import build_interpolator, group_by_stations, shared_grid, stack_epochs, difference_grids, epoch_statistics
+        from survey_io import ColumnError, read_survey
+
+    # BACA SEMUA EPOCH
+
+    epochs = []
+    labels = []
+    for f in sorted(uploaded_files, key=lambda f: f.name):
+        try:
+            with timer.stage("baca_data"):
+                x, y, val, _ = read_survey(f)
+        except ColumnError:
+            st.error(f"{f.name} harus punya kolom X, Y, dan Value.")
+            st.stop()
+        except Exception as e:
+            st.error(f"Gagal membaca {f.name}: {e}")
+            st.stop()
+        epochs.append((np.column_stack((x, y)), val))
+        labels.append(os.path.splitext(f.name)[0])
+
+    st.write(f"Jumlah epoch: {len(epochs)} — titik per epoch: {', '.join(str(len(v)) for _, v in epochs)}")
+
+
+    # PENGATURAN
+
+    col1, col2 = st.columns([1,3])
+    with col1:
+        res = st.slider('Resolusi grid', 50, 400, 200)
+        method = st.selectbox('Metode interpolasi', ['linear', 'cubic', 'nearest'])
+        reference = st.radio('Selisih terhadap', ['previous', 'first'],
+                             format_func=lambda r: 'Epoch sebelumnya' if r == 'previous' else 'Epoch pertama')
+
+
+    # INTERPOLASI KE GRID BERSAMA
+
+    XI, YI, (xmin, xmax, ymin, ymax) = shared_grid(epochs, res)
+    groups = group_by_stations(epochs)
+    n_points = sum(len(v) for _, v in epochs)
+
+    with timer.stage("interpolator", points=n_points):
+        try:
+            interpolators = [cached_interpolator(g['points'], g['values'], method) for g in groups]
+        except Exception as e:
+            st.warning(f'Interpolator {method} gagal: {e}. Memakai nearest.')
+            interpolators = [cached_interpolator(g['points'], g['values'], 'nearest') for g in groups]
+
+    with timer.stage("evaluasi_grid", points=n_points, grid=(len(epochs),) + XI.shape):
+        stack = stack_epochs(groups, interpolators, XI, YI)
+
+    with timer.stage("selisih_statistik", grid=stack.shape):
+        diffs = difference_grids(stack, reference)
+        stats = epoch_statistics(stack)
+
+    if reference == 'first':
+        diff_labels = [f"{lab} - {labels[0]}" for lab in labels[1:]]
+    else:
+        diff_labels = [f"{b} - {a}" for a, b in zip(labels[:-1], labels[1:])]
+
+    # Skala warna simetris bersama untuk semua selisih
+    dlim = np.nanmax(np.abs(diffs)) if np.any(np.isfinite(diffs)) else 1.0
+
+
+    # PLOT SELISIH & STATISTIK
+
+    with col2:
+        panels = [(d, lab, 'RdBu_r', -dlim, dlim) for d, lab in zip(diffs, diff_labels)]
+        # Perubahan total epoch terakhir - pertama (tersedia juga saat selisih per epoch sebelumnya)
+        tlim = np.nanmax(np.abs(stats['delta'])) if np.any(np.isfinite(stats['delta'])) else 1.0
+        panels.append((stats['delta'], f"Delta total ({labels[-1]} - {labels[0]})", 'RdBu_r', -tlim, tlim))
+        panels.append((stats['mean'], 'Rata-rata', 'jet', np.nanmin(stats['mean']), np.nanmax(stats['mean'])))
+        panels.append((stats['std'], 'Standar deviasi', 'viridis', 0, np.nanmax(stats['std'])))
+
+        ncol = min(3, len(panels))
+        nrow = int(np.ceil(len(panels) / ncol))
+        with timer.stage("plot", grid=stack.shape):
+            fig, axes = plt.subplots(nrow, ncol, figsize=(5 * ncol, 4 * nrow), squeeze=False)
+            for ax, (grid, title, cmap, lo, hi) in zip(axes.flat, panels):
+                im = ax.imshow(np.flipud(grid), extent=(xmin, xmax, ymin, ymax), aspect='auto', cmap=cmap, vmin=lo, vmax=hi)
+                plt.colorbar(im, ax=ax)
+                ax.set_title(title)
+            for ax in axes.flat[len(panels):]:
+                ax.axis('off')
+            fig.tight_layout()
+            st.pyplot(fig)
+
+        summary = pd.DataFrame({
+            'Selisih': diff_labels,
+            'Rata-rata': np.nanmean(diffs.reshape(len(diffs), -1), axis=1),
+            'Min': np.nanmin(diffs.reshape(len(diffs), -1), axis=1),
+            'Maks': np.nanmax(diffs.reshape(len(diffs), -1), axis=1),
+        })
+        st.dataframe(summary, use_container_width=True)
+
+
+    # KMZ: SATU GROUNDOVERLAY PER SELISIH + DELTA TOTAL, RATA-RATA & STD
+
+    with timer.stage("imsave_png", grid=stack.shape):
+        layers = []
+        for i, (grid, title, cmap, lo, hi) in enumerate(panels):
+            layers.append((f"layer_{i}.png", title, save_overlay_png(grid, lo, hi, cmap), i == 0))
+
+    overlays = ""
+    for href, title, _, visible in layers:
+        overlays += f"""
+  <GroundOverlay>
+    <name>{escape(title)}</name>
+    <visibility>{int(visible)}</visibility>
+    <Icon>
+      <href>{href}</href>
+    </Icon>
+    <LatLonBox>
+      <north>{ymax}</north>
+      <south>{ymin}</south>
+      <east>{xmax}</east>
+      <west>{xmin}</west>
+    </LatLonBox>
+  </GroundOverlay>"""
+
+    kml_doc = f"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+  <name>Selisih Multi-Epoch</name>
+  <Folder>
+    <name>Selisih dan Statistik</name>{overlays}
+  </Folder>
+</Document>
+</kml>
+"""
+
+    kmz_bytes = io.BytesIO()
+    with timer.stage("zip_kmz"):
+        with zipfile.ZipFile(kmz_bytes, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("doc.kml", kml_doc)
+            for href, _, png, _ in layers:
+                zf.writestr(href, png)
+    kmz_bytes.seek(0)
+
+    st.download_button(
+        "Download Selisih KMZ (Google Earth)",
+        kmz_bytes.getvalue(),
+        "selisih_epoch.kmz",
+        mime="application/vnd.google-earth.kmz"
+    )
+
+
+    # PANEL WAKTU PER TAHAP
+
+    timing_rows, timing_total = timer.rows(), timer.total_seconds()
+    timer.flush()
+    with st.expander(f"Waktu per tahap ({timing_total:.2f} s)"):
+        st.dataframe(pd.DataFrame(timing_rows), use_container_width=True)
+
+elif uploaded_files:
+    st.info("Upload minimal 2 epoch untuk menghitung selisih.")
+else:
+    st.info("Silakan upload file survei tiap epoch untuk memulai.")
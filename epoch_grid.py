@@ -0,0 +1,69 @@
+import warnings
+
+import numpy as np
+from scipy.interpolate import CloughTocher2DInterpolator, LinearNDInterpolator, NearestNDInterpolator
+from scipy.spatial import Delaunay
+
+
+def build_interpolator(points, values, method='linear'):
+    # values boleh 2-D (n_titik, n_epoch): satu triangulasi dipakai untuk semua kolom
+    if method == 'nearest':
+        return NearestNDInterpolator(points, values)
+    tri = Delaunay(points)
+    if method == 'cubic':
+        return CloughTocher2DInterpolator(tri, values)
+    return LinearNDInterpolator(tri, values)
+
+
+def group_by_stations(epochs):
+    # Epoch yang mengukur ulang stasiun yang sama (koordinat identik) digabung,
+    # sehingga triangulasinya hanya dibangun sekali
+    groups = []
+    for i, (points, _) in enumerate(epochs):
+        for group in groups:
+            if group['points'].shape == points.shape and np.array_equal(group['points'], points):
+                group['members'].append(i)
+                break
+        else:
+            groups.append({'points': points, 'members': [i]})
+    for group in groups:
+        group['values'] = np.column_stack([epochs[i][1] for i in group['members']])
+    return groups
+
+
+def shared_grid(epochs, res):
+    # Satu grid bersama dari bounding box gabungan semua epoch
+    xmin = min(p[:, 0].min() for p, _ in epochs)
+    xmax = max(p[:, 0].max() for p, _ in epochs)
+    ymin = min(p[:, 1].min() for p, _ in epochs)
+    ymax = max(p[:, 1].max() for p, _ in epochs)
+    XI, YI = np.meshgrid(np.linspace(xmin, xmax, res), np.linspace(ymin, ymax, res))
+    return XI, YI, (xmin, xmax, ymin, ymax)
+
+
+def stack_epochs(groups, interpolators, XI, YI):
+    # Hasil: array 3-D (n_epoch, ny, nx)
+    n_epoch = sum(len(g['members']) for g in groups)
+    stack = np.empty((n_epoch,) + XI.shape)
+    for group, interp in zip(groups, interpolators):
+        zi = interp(XI, YI).reshape(XI.shape + (len(group['members']),))
+        stack[group['members']] = np.moveaxis(zi, -1, 0)
+    return stack
+
+
+def difference_grids(stack, reference='previous'):
+    # 'previous': epoch[i] - epoch[i-1], 'first': epoch[i] - epoch[0]
+    if reference == 'first':
+        return stack[1:] - stack[0]
+    return np.diff(stack, axis=0)
+
+
+def epoch_statistics(stack):
+    # Sel yang NaN di semua epoch memicu RuntimeWarning; hasilnya tetap NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return {
+            'delta': stack[-1] - stack[0],
+            'mean': np.nanmean(stack, axis=0),
+            'std': np.nanstd(stack, axis=0),
+        }
@@ -0,0 +1,259 @@
+import contextlib
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Format ekspor grid: ekstensi -> label di UI
+GRID_FORMATS = {
+    "grd": "Surfer 7 biner (.grd)",
+    "asc": "ESRI ASCII (.asc)",
+    "npz": "NumPy (.npz)",
+    "tif": "GeoTIFF deflate (.tif)",
+}
+
+# Ukuran blok baris saat menulis (~1 MB float32 per blok), jadi tidak pernah ada salinan
+# grid penuh kedua di memori; grid boleh berupa np.memmap
+BLOCK_BYTES = 2 ** 20
+SURFER_BLANK = 1.70141e38
+ESRI_NODATA = -9999.0
+
+
+def _block_rows(ncols):
+    return max(1, BLOCK_BYTES // (4 * ncols))
+
+
+def _row_blocks(Z, top_down=False):
+    # View per blok baris. Baris 0 ZI = Y minimum; top_down untuk format yang mulai dari utara
+    # (blok pendek selalu paling akhir, sesuai aturan strip TIFF)
+    n = _block_rows(Z.shape[1])
+    if not top_down:
+        for r0 in range(0, Z.shape[0], n):
+            yield Z[r0:r0 + n]
+    else:
+        for r1 in range(Z.shape[0], 0, -n):
+            yield Z[max(0, r1 - n):r1][::-1]
+
+
+@contextlib.contextmanager
+def _open(f, mode):
+    if isinstance(f, (str, os.PathLike)):
+        with open(f, mode) as fh:
+            yield fh
+    else:
+        yield f
+
+
+def _spacing(Z, extent):
+    xmin, xmax, ymin, ymax = extent
+    ny, nx = Z.shape
+    return (xmax - xmin) / max(nx - 1, 1), (ymax - ymin) / max(ny - 1, 1)
+
+
+# SURFER 7 BINER: tag DSRB / GRID / DATA, float64, baris dari Y minimum ke atas
+
+def write_surfer7(f, Z, extent):
+    xmin, xmax, ymin, ymax = extent
+    ny, nx = Z.shape
+    dx, dy = _spacing(Z, extent)
+    with _open(f, "wb") as fh:
+        fh.write(struct.pack("<4sii", b"DSRB", 4, 2))
+        fh.write(struct.pack("<4sii", b"GRID", 72, ny) + struct.pack("<i8d", nx, xmin, ymin, dx, dy,
+                                                                     np.nanmin(Z), np.nanmax(Z), 0.0, SURFER_BLANK))
+        fh.write(struct.pack("<4si", b"DATA", ny * nx * 8))
+        for block in _row_blocks(Z):
+            fh.write(np.where(np.isnan(block), SURFER_BLANK, block).astype("<f8", copy=False).tobytes())
+
+
+def read_surfer7(f):
+    with _open(f, "rb") as fh:
+        buf = fh.read()
+    pos = 0
+    while pos < len(buf):
+        tag, size = struct.unpack_from("<4si", buf, pos)
+        pos += 8
+        if tag == b"GRID":
+            ny, nx, xmin, ymin, dx, dy, _, _, _, blank = struct.unpack_from("<ii8d", buf, pos)
+        elif tag == b"DATA":
+            Z = np.frombuffer(buf, "<f8", ny * nx, pos).reshape(ny, nx).copy()
+            Z[Z >= blank] = np.nan
+            return Z, (xmin, xmin + dx * (nx - 1), ymin, ymin + dy * (ny - 1))
+        pos += size
+    raise ValueError("File Surfer 7 tidak punya seksi DATA.")
+
+
+# ESRI ASCII: header lalu baris dari utara ke selatan
+
+def write_esri_ascii(f, Z, extent):
+    xmin, xmax, ymin, ymax = extent
+    ny, nx = Z.shape
+    dx, dy = _spacing(Z, extent)
+    # Sel tidak persegi: DX/DY (dibaca GDAL) menggantikan cellsize
+    cell = f"cellsize {dx!r}\n" if np.isclose(dx, dy, rtol=1e-9) else f"dx {dx!r}\ndy {dy!r}\n"
+    with _open(f, "wb") as fh:
+        fh.write(f"ncols {nx}\nnrows {ny}\nxllcenter {xmin!r}\nyllcenter {ymin!r}\n{cell}"
+                 f"NODATA_value {ESRI_NODATA:g}\n".encode("ascii"))
+        for block in _row_blocks(Z, top_down=True):
+            np.savetxt(fh, np.where(np.isnan(block), ESRI_NODATA, block), fmt="%.9g")
+
+
+def read_esri_ascii(f):
+    with _open(f, "rb") as fh:
+        text = fh.read().decode("ascii")
+    header = {}
+    lines = text.split("\n", 8)
+    for i, line in enumerate(lines):
+        parts = line.split()
+        if not parts or not parts[0][0].isalpha():
+            break
+        header[parts[0].lower()] = float(parts[1])
+    body = "\n".join(lines[i:])
+    nx, ny = int(header["ncols"]), int(header["nrows"])
+    dx = header.get("cellsize", header.get("dx"))
+    dy = header.get("cellsize", header.get("dy"))
+    # Seluruh isi dibaca sekali dengan parser C numpy, lalu dibalik ke baris Y minimum dulu
+    Z = np.fromstring(body, sep=" ", count=nx * ny).reshape(ny, nx)[::-1].copy()
+    Z[Z == header.get("nodata_value", np.nan)] = np.nan
+    xmin = header["xllcenter"] if "xllcenter" in header else header["xllcorner"] + dx / 2
+    ymin = header["yllcenter"] if "yllcenter" in header else header["yllcorner"] + dy / 2
+    return Z, (xmin, xmin + dx * (nx - 1), ymin, ymin + dy * (ny - 1))
+
+
+# NUMPY: grid + sumbu X/Y tanpa kompresi, ditulis langsung dari buffer array
+
+def write_npz(f, Z, extent):
+    xmin, xmax, ymin, ymax = extent
+    ny, nx = Z.shape
+    with _open(f, "wb") as fh:
+        np.savez(fh, z=Z, x=np.linspace(xmin, xmax, nx), y=np.linspace(ymin, ymax, ny))
+
+
+def read_npz(f):
+    with np.load(f, allow_pickle=False) as npz:
+        x, y = npz["x"], npz["y"]
+        return npz["z"], (x[0], x[-1], y[0], y[-1])
+
+
+# GEOTIFF: strip = blok baris float32 yang dikompres deflate satu per satu, IFD ditulis
+# di akhir file (offset-nya ditambal di header), jadi hasil kompresi tidak perlu ditahan
+
+_TIFF_TYPES = {"H": 3, "I": 4, "d": 12, "s": 2}
+
+
+def _geokeys(epsg):
+    # GTModelType, GTRasterType (PixelIsArea), lalu CRS kalau diketahui
+    keys = [(1025, 0, 1, 1)]
+    if epsg is None:
+        keys.insert(0, (1024, 0, 1, 32767))
+    elif epsg == 4326:
+        keys[:0] = [(1024, 0, 1, 2)]
+        keys.append((2048, 0, 1, 4326))
+    else:
+        keys[:0] = [(1024, 0, 1, 1)]
+        keys.append((3072, 0, 1, epsg))
+    return [1, 1, 0, len(keys)] + [v for k in keys for v in k]
+
+
+def write_geotiff(f, Z, extent, epsg=None, level=6):
+    xmin, xmax, ymin, ymax = extent
+    ny, nx = Z.shape
+    dx, dy = _spacing(Z, extent)
+    with _open(f, "wb") as fh:
+        start = fh.tell()
+        fh.write(b"II*\x00\x00\x00\x00\x00")
+        offsets, counts = [], []
+        for block in _row_blocks(Z, top_down=True):
+            data = zlib.compress(np.ascontiguousarray(block, dtype="<f4").tobytes(), level)
+            offsets.append(fh.tell() - start)
+            counts.append(len(data))
+            fh.write(data)
+        fh.write(b"\x00" * (-(fh.tell() - start) % 2))
+
+        tags = [
+            (256, "I", [nx]), (257, "I", [ny]), (258, "H", [32]), (259, "H", [8]), (262, "H", [1]),
+            (273, "I", offsets), (277, "H", [1]), (278, "I", [_block_rows(nx)]), (279, "I", counts),
+            (284, "H", [1]), (339, "H", [3]),
+            (33550, "d", [dx, dy, 0.0]),
+            (33922, "d", [0.0, 0.0, 0.0, xmin - dx / 2, ymax + dy / 2, 0.0]),
+            (34735, "H", _geokeys(epsg)),
+            (42113, "s", b"nan\x00"),
+        ]
+        ifd_pos = fh.tell() - start
+        extra_pos = ifd_pos + 2 + 12 * len(tags) + 4
+        entries, extra = [], b""
+        for tag, fmt, values in tags:
+            payload = values if fmt == "s" else struct.pack(f"<{len(values)}{fmt}", *values)
+            count = len(payload) if fmt == "s" else len(values)
+            if len(payload) <= 4:
+                entries.append(struct.pack("<HHI", tag, _TIFF_TYPES[fmt], count) + payload.ljust(4, b"\x00"))
+            else:
+                entries.append(struct.pack("<HHII", tag, _TIFF_TYPES[fmt], count, extra_pos + len(extra)))
+                extra += payload + b"\x00" * (len(payload) % 2)
+        fh.write(struct.pack("<H", len(tags)) + b"".join(entries) + struct.pack("<I", 0) + extra)
+        end = fh.tell()
+        fh.seek(start + 4)
+        fh.write(struct.pack("<I", ifd_pos))
+        fh.seek(end)
+
+
+def read_geotiff(f):
+    # Pembaca TIFF strip float (tanpa kompresi / deflate), cukup untuk file dari write_geotiff
+    with _open(f, "rb") as fh:
+        buf = fh.read()
+    if buf[:4] != b"II*\x00":
+        raise ValueError("Hanya GeoTIFF little-endian yang didukung.")
+    pos = struct.unpack_from("<I", buf, 4)[0]
+    sizes = {1: 1, 2: 1, 3: 2, 4: 4, 12: 8}
+    codes = {1: "B", 2: "B", 3: "H", 4: "I", 12: "d"}
+    tags = {}
+    for i in range(struct.unpack_from("<H", buf, pos)[0]):
+        tag, typ, count, value = struct.unpack_from("<HHI4s", buf, pos + 2 + 12 * i)
+        if typ not in codes:
+            continue
+        n = sizes[typ] * count
+        raw = value[:n] if n <= 4 else buf[struct.unpack("<I", value)[0]:][:n]
+        tags[tag] = struct.unpack(f"<{count}{codes[typ]}", raw)
+
+    nx, ny = tags[256][0], tags[257][0]
+    dtype = {(32, 3): "<f4", (64, 3): "<f8"}[(tags[258][0], tags.get(339, (1,))[0])]
+    compression = tags.get(259, (1,))[0]
+    if compression not in (1, 8, 32946):
+        raise ValueError(f"Kompresi TIFF {compression} tidak didukung.")
+    rows_per_strip = tags.get(278, (ny,))[0]
+    out = np.empty((ny, nx), dtype=dtype)
+    for k, (off, cnt) in enumerate(zip(tags[273], tags[279])):
+        data = buf[off:off + cnt]
+        if compression != 1:
+            data = zlib.decompress(data)
+        r0 = k * rows_per_strip
+        out[r0:r0 + rows_per_strip] = np.frombuffer(data, dtype).reshape(-1, nx)
+
+    sx, sy = tags[33550][:2]
+    tx, ty = tags[33922][3:5]
+    xmin, ymax = tx + sx / 2, ty - sy / 2
+    Z = out[::-1].astype(float)
+    return Z, (xmin, xmin + sx * (nx - 1), ymax - sy * (ny - 1), ymax)
+
+
+_WRITERS = {"grd": write_surfer7, "asc": write_esri_ascii, "npz": write_npz, "tif": write_geotiff}
+_READERS = {"grd": read_surfer7, "asc": read_esri_ascii, "npz": read_npz, "tif": read_geotiff}
+
+
+def write_grid(f, Z, extent, fmt, epsg=None):
+    # extent = (xmin, xmax, ymin, ymax) node pertama/terakhir, sama dengan profil.sample_grid
+    if fmt == "tif":
+        return write_geotiff(f, Z, extent, epsg)
+    return _WRITERS[fmt](f, Z, extent)
+
+
+def read_grid(f, fmt=None):
+    # Kembalikan ZI (baris 0 = Y minimum, NaN = kosong) dan extent
+    if fmt is None:
+        name = f if isinstance(f, (str, os.PathLike)) else getattr(f, "name", "")
+        fmt = os.path.splitext(os.fspath(name))[1].lower().lstrip(".")
+        if fmt == "tiff":
+            fmt = "tif"
+    if fmt not in _READERS:
+        raise ValueError(f"Format grid .{fmt} tidak didukung.")
+    return _READERS[fmt](f)
@@ -0,0 +1,55 @@
+import numpy as np
+from scipy.interpolate import griddata
+from scipy.spatial import Delaunay, QhullError, cKDTree
+
+
+def default_max_distance(points, factor=3.0):
+    # Perkiraan jarak wajar: kelipatan median jarak ke stasiun terdekat
+    dist, _ = cKDTree(points).query(points, k=2)
+    spacing = np.median(dist[:, 1])
+    return float(factor * spacing) if spacing > 0 else float(np.ptp(points, axis=0).max())
+
+
+def default_max_edge(points, factor=2.0):
+    # Untuk concave hull: kelipatan median sisi terpanjang segitiga Delaunay
+    return float(factor * np.median(_longest_edges(points, Delaunay(points))))
+
+
+def _longest_edges(points, tri):
+    corners = points[tri.simplices]
+    return np.linalg.norm(corners - np.roll(corners, 1, axis=1), axis=2).max(axis=1)
+
+
+def distance_mask(points, XI, YI, max_dist):
+    # True = sel dipakai (ada stasiun dalam radius max_dist)
+    cells = np.column_stack((XI.ravel(), YI.ravel()))
+    dist, _ = cKDTree(points).query(cells, k=1, distance_upper_bound=max_dist)
+    return np.isfinite(dist).reshape(XI.shape)
+
+
+def hull_mask(points, XI, YI, max_edge):
+    # Concave hull sederhana: segitiga Delaunay dengan sisi > max_edge dibuang
+    tri = Delaunay(points)
+    keep = _longest_edges(points, tri) <= max_edge
+    simplex = tri.find_simplex(np.column_stack((XI.ravel(), YI.ravel())))
+    return ((simplex >= 0) & keep[simplex]).reshape(XI.shape)
+
+
+def build_mask(points, XI, YI, hull, max_dist=None):
+    # Mask concave hull (hull=True) atau jarak KD-tree; max_dist kosong/0 = otomatis.
+    # Stasiun degenerate (mis. satu lintasan lurus) membuat Delaunay gagal (QhullError),
+    # jadi dipakai mask jarak. Kembalikan (mask, True kalau hull benar-benar dipakai)
+    if hull:
+        try:
+            return hull_mask(points, XI, YI, max_dist or default_max_edge(points)), True
+        except QhullError:
+            pass
+    return distance_mask(points, XI, YI, max_dist or default_max_distance(points)), False
+
+
+def interpolate_masked(points, values, XI, YI, mask, method='linear'):
+    # Hanya sel di dalam mask yang dikirim ke interpolator; sisanya NaN
+    ZI = np.full(XI.shape, np.nan)
+    if mask.any():
+        ZI[mask] = griddata(points, values, (XI[mask], YI[mask]), method=method)
+    return ZI
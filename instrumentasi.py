@@ -0,0 +1,173 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows tidak punya modul resource
+    resource = None
+
+# Lokasi output bisa diatur lewat environment variable. File Prometheus default satu per app
+# (callista_metrics_<app>.prom): tiap proses hanya tahu total miliknya sendiri, jadi dua server
+# yang menulis file yang sama saling menimpa. CALLISTA_PROM_FILE harus unik per server
+LOG_PATH = os.environ.get("CALLISTA_TIMING_LOG", "pipeline_timing.jsonl")
+PROM_PATH = os.environ.get("CALLISTA_PROM_FILE")
+
+# Total per (app, stage) selama proses server hidup (dipakai untuk metrik Prometheus)
+_TOTALS = {}
+_LOCK = threading.Lock()
+
+
+def peak_rss_bytes():
+    # ru_maxrss: kilobyte di Linux, byte di macOS. Puncak sepanjang umur proses, jadi di
+    # server yang hidup lama nilainya sama untuk semua tahap; hanya untuk info proses
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else None
+
+
+def current_rss_bytes():
+    # RSS saat ini dari /proc/self/statm (Linux); None di platform lain
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError, TypeError):
+        return None
+
+
+class StageTimer:
+    # Catat waktu, memori, jumlah titik dan ukuran grid untuk tiap tahap pipeline.
+    # Memori per tahap = selisih RSS saat ini sebelum/sesudah tahap (proses dipakai bersama
+    # semua sesi, jadi sesi lain yang berjalan bersamaan ikut terhitung).
+    # tracemalloc hanya dipakai kalau sudah aktif (mis. PYTHONTRACEMALLOC=1), supaya mode
+    # normal tetap ringan. Catatan: reset_peak() berlaku untuk seluruh proses, jadi nilai
+    # tracemalloc hanya akurat kalau tidak ada sesi lain yang sedang menjalankan tahap.
+
+    def __init__(self, app):
+        self.app = app
+        self.prom_path = PROM_PATH or f"callista_metrics_{app}.prom"
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, points=None, grid=None):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        rss_start = current_rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            rss_end = current_rss_bytes()
+            self.records.append({
+                "ts": time.time(),
+                "app": self.app,
+                "run_id": self.run_id,
+                "stage": name,
+                "seconds": seconds,
+                "rss_bytes": rss_end,
+                "rss_delta_bytes": None if rss_start is None or rss_end is None else rss_end - rss_start,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "tracemalloc_peak_bytes": (tracemalloc.get_traced_memory()[1] - mem_start) if tracing else None,
+                "points": None if points is None else int(points),
+                "grid": None if grid is None else [int(g) for g in grid],
+            })
+
+    def rows(self):
+        # Untuk ditampilkan di panel Streamlit
+        return [{
+            "Tahap": r["stage"],
+            "Waktu (ms)": round(r["seconds"] * 1000, 2),
+            "ΔRSS (MB)": None if r["rss_delta_bytes"] is None else round(r["rss_delta_bytes"] / 2**20, 1),
+            "RSS (MB)": None if r["rss_bytes"] is None else round(r["rss_bytes"] / 2**20, 1),
+            "tracemalloc (MB)": None if r["tracemalloc_peak_bytes"] is None else round(r["tracemalloc_peak_bytes"] / 2**20, 2),
+            "Titik": r["points"],
+            "Grid": None if r["grid"] is None else "x".join(str(g) for g in r["grid"]),
+        } for r in self.records]
+
+    def total_seconds(self):
+        return sum(r["seconds"] for r in self.records)
+
+    def write_log(self, path=None):
+        # Tambahkan satu baris JSON per tahap
+        path = path or LOG_PATH
+        with _LOCK, open(path, "a", encoding="utf-8") as f:
+            for r in self.records:
+                f.write(json.dumps(r) + "\n")
+
+    def write_prometheus(self, path=None):
+        # File default per app: hanya seri app ini. File dari CALLISTA_PROM_FILE dipakai semua
+        # app di proses ini (mis. app + warm-up), jadi berisi semua seri proses
+        path = path or self.prom_path
+        own = path != PROM_PATH
+        with _LOCK:
+            for r in self.records:
+                tot = _TOTALS.setdefault((r["app"], r["stage"]), {"count": 0, "sum": 0.0})
+                tot["count"] += 1
+                tot["sum"] += r["seconds"]
+                tot["last"] = r
+            text = _format_prometheus({k: t for k, t in _TOTALS.items() if not own or k[0] == self.app})
+            # Tulis atomik: textfile collector node_exporter bisa membaca file setengah jadi
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+
+    def flush(self):
+        # Dipanggil di akhir run; kegagalan menulis log tidak boleh menghentikan app.
+        # Catatan dikosongkan setelah ditulis supaya flush berikutnya tidak menggandakan
+        # baris log dan counter Prometheus (ambil rows()/total_seconds() sebelum flush)
+        try:
+            self.write_log()
+            self.write_prometheus()
+        except OSError:
+            pass
+        self.records = []
+
+
+_METRICS = [
+    ("callista_stage_duration_seconds", "gauge", "Wall time of the last run of the stage.",
+     lambda t: t["last"]["seconds"]),
+    ("callista_stage_rss_delta_bytes", "gauge", "Change in current RSS during the last run of the stage.",
+     lambda t: t["last"]["rss_delta_bytes"]),
+    ("callista_stage_rss_bytes", "gauge", "Current RSS at the end of the last run of the stage.",
+     lambda t: t["last"]["rss_bytes"]),
+    ("callista_stage_tracemalloc_peak_bytes", "gauge", "tracemalloc peak above the stage start (only when tracing).",
+     lambda t: t["last"]["tracemalloc_peak_bytes"]),
+    ("callista_stage_points", "gauge", "Number of survey points seen by the last run of the stage.",
+     lambda t: t["last"]["points"]),
+    ("callista_stage_grid_cells", "gauge", "Number of grid cells handled by the last run of the stage.",
+     lambda t: None if t["last"]["grid"] is None else math.prod(t["last"]["grid"])),
+    ("callista_stage_seconds_total", "counter", "Total wall time spent in the stage since server start.",
+     lambda t: t["sum"]),
+    ("callista_stage_runs_total", "counter", "Number of runs of the stage since server start.",
+     lambda t: t["count"]),
+]
+
+
+def _format_prometheus(totals):
+    lines = []
+    for name, kind, help_text, getter in _METRICS:
+        samples = []
+        for (app, stage), tot in sorted(totals.items()):
+            value = getter(tot)
+            if value is not None:
+                samples.append(f'{name}{{app="{app}",stage="{stage}"}} {value}')
+        if samples:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+    return "\n".join(lines) + "\n"
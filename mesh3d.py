@@ -0,0 +1,217 @@
+import json
+import struct
+
+import numpy as np
+
+# Baris blok per potongan saat menghitung error, supaya memori sementara tetap kecil
+BAND_ROWS = 256
+
+
+def _block_errors(Zp, s):
+    # Batas error mesh tiap blok s x s. e = error maksimum terhadap patch bilinear dari
+    # 4 sudutnya (termasuk sisi utara/timur), t = twist sudut. Segitiga template (2 segitiga
+    # atau kipas dari titik tengah) menyimpang dari patch bilinear paling banyak e + |t|/4,
+    # jadi error mesh terhadap grid <= 2e + |t|/4. NaN di blok -> NaN (dipecah/dibuang)
+    n = Zp.shape[0] - 1
+    nb = n // s
+    C = Zp[::s, ::s]
+    w = (np.arange(s) / s).astype(Zp.dtype)
+    wr = w[None, :, None, None]
+    wc = w[None, None, None, :]
+    err = np.empty((nb, nb), dtype=Zp.dtype)
+    band = max(1, BAND_ROWS // s)
+    for b0 in range(0, nb, band):
+        b1 = min(nb, b0 + band)
+        Zb = Zp[b0 * s:b1 * s, :n].reshape(b1 - b0, s, nb, s)
+        c00 = C[b0:b1, :-1][:, None, :, None]
+        c01 = C[b0:b1, 1:][:, None, :, None]
+        c10 = C[b0 + 1:b1 + 1, :-1][:, None, :, None]
+        c11 = C[b0 + 1:b1 + 1, 1:][:, None, :, None]
+        B = (c00 * (1 - wr) + c10 * wr) * (1 - wc) + (c01 * (1 - wr) + c11 * wr) * wc
+        err[b0:b1] = np.abs(Zb - B).max(axis=(1, 3))
+
+    # Sisi utara/timur: interpolasi linear sepanjang garis blok
+    w1 = w[None, None, :]
+    rows = Zp[::s, :n].reshape(nb + 1, nb, s)
+    h = np.abs(rows - (C[:, :-1, None] * (1 - w1) + C[:, 1:, None] * w1)).max(axis=2)
+    cols = Zp[:n, ::s].T.reshape(nb + 1, nb, s)
+    v = np.abs(cols - (C[:-1, :].T[:, :, None] * (1 - w1) + C[1:, :].T[:, :, None] * w1)).max(axis=2)
+    err = np.maximum(err, np.maximum(h[1:], v[1:].T))
+
+    twist = np.abs(C[:-1, :-1] - C[:-1, 1:] - C[1:, :-1] + C[1:, 1:])
+    return 2 * err + twist / 4
+
+
+def _dilate4(a):
+    out = a.copy()
+    out[1:] |= a[:-1]
+    out[:-1] |= a[1:]
+    out[:, 1:] |= a[:, :-1]
+    out[:, :-1] |= a[:, 1:]
+    return out
+
+
+def _pool2(a):
+    return a.reshape(a.shape[0] // 2, 2, a.shape[1] // 2, 2).any(axis=(1, 3))
+
+
+def _up2(a):
+    return a.repeat(2, axis=0).repeat(2, axis=1)
+
+
+def decimate_grid(Z, tol):
+    # Decimation adaptif grid reguler dengan quadtree seimbang (beda level tetangga <= 1).
+    # Blok dipecah selama error terhadap patch sudutnya > tol. Daun tanpa tetangga lebih
+    # halus = 2 segitiga; daun dengan tetangga lebih halus = kipas dari titik tengah yang
+    # ikut memakai titik tengah sisi tetangga, jadi mesh bebas celah (crack-free).
+    # Hasil: indeks node (baris, kolom) per sudut segitiga, shape (m, 3, 2)
+    ny, nx = Z.shape
+    depth = int(np.ceil(np.log2(max(ny, nx))))
+    M = 2 ** depth + 1
+    if M - 1 < max(ny, nx):
+        depth += 1
+        M = 2 ** depth + 1
+    Zp = np.full((M, M), np.nan, dtype=np.float32)
+    Zp[:ny, :nx] = Z
+
+    # 1. Keputusan pecah per level dari error (level 0 = satu blok, level depth = sel 1x1)
+    split = []
+    empty = []
+    for L in range(depth):
+        s = (M - 1) >> L
+        err = _block_errors(Zp, s)
+        split.append(~(err <= tol))  # NaN ikut dipecah
+        nan_blocks = np.isnan(Zp[:-1, :-1]).reshape(2 ** L, s, 2 ** L, s).all(axis=(1, 3))
+        empty.append(nan_blocks)
+    # Blok yang seluruhnya NaN tidak perlu dipecah: langsung dibuang
+    split = [sp & ~em for sp, em in zip(split, empty)]
+
+    # 2. Atas-ke-bawah: blok hanya ada kalau induknya dipecah
+    eff = [split[0]]
+    for L in range(1, depth):
+        eff.append(split[L] & _up2(eff[L - 1]))
+
+    # 3. Bawah-ke-atas: paksa keseimbangan (tetangga blok yang dipecah ikut dipecah di level induk)
+    for L in range(depth - 1, 0, -1):
+        eff[L - 1] |= _pool2(_dilate4(eff[L]))
+    # Propagasi ulang ke bawah setelah penyeimbangan
+    for L in range(1, depth):
+        eff[L] &= _up2(eff[L - 1])
+    eff.append(np.zeros((2 ** depth, 2 ** depth), dtype=bool))
+
+    # 4. Segitiga dari daun tiap level
+    tris = []
+    exist = np.ones((1, 1), dtype=bool)
+    for L in range(depth + 1):
+        s = (M - 1) >> L
+        leaf = exist & ~eff[L]
+        i, j = np.nonzero(leaf)
+        if len(i):
+            tris.append(_leaf_triangles(i, j, s, eff[L]))
+        exist = _up2(eff[L]) if L < depth else None
+
+    tris = np.concatenate(tris) if tris else np.empty((0, 3, 2), dtype=np.int64)
+    # Buang segitiga yang menyentuh node NaN (di luar data / padding)
+    ok = ~np.isnan(Zp[tris[..., 0], tris[..., 1]]).any(axis=1)
+    return tris[ok]
+
+
+def _leaf_triangles(i, j, s, eff):
+    # Sudut (baris, kolom): p00 kiri-bawah, p01 kanan-bawah, p11 kanan-atas, p10 kiri-atas
+    # (baris naik = Y naik), urutan CCW dilihat dari atas
+    r0, c0 = i * s, j * s
+    r1, c1 = r0 + s, c0 + s
+    p00 = np.stack((r0, c0), -1)
+    p01 = np.stack((r0, c1), -1)
+    p11 = np.stack((r1, c1), -1)
+    p10 = np.stack((r1, c0), -1)
+    if s == 1:
+        return np.concatenate((np.stack((p00, p01, p11), 1), np.stack((p00, p11, p10), 1)))
+
+    # Titik tengah sisi dipakai kalau tetangga di sisi itu dipecah
+    pad = np.pad(eff, 1)
+    south = pad[i, j + 1]
+    east = pad[i + 1, j + 2]
+    north = pad[i + 2, j + 1]
+    west = pad[i + 1, j]
+    fan = south | east | north | west
+
+    out = [np.stack((p00[~fan], p01[~fan], p11[~fan]), 1), np.stack((p00[~fan], p11[~fan], p10[~fan]), 1)]
+    h = s // 2
+    ctr = np.stack((r0 + h, c0 + h), -1)
+    edges = [
+        (south, p00, p01, np.stack((r0, c0 + h), -1)),
+        (east, p01, p11, np.stack((r0 + h, c1), -1)),
+        (north, p11, p10, np.stack((r1, c0 + h), -1)),
+        (west, p10, p00, np.stack((r0 + h, c0), -1)),
+    ]
+    for has_mid, a, b, mid in edges:
+        m = fan & has_mid
+        out.append(np.stack((ctr[m], a[m], mid[m]), 1))
+        out.append(np.stack((ctr[m], mid[m], b[m]), 1))
+        m = fan & ~has_mid
+        out.append(np.stack((ctr[m], a[m], b[m]), 1))
+    return np.concatenate(out)
+
+
+def build_mesh(Z, xi_lin, yi_lin, tol, z_scale=1.0):
+    # Node unik dari segitiga -> vertex (x, y, z) dan indeks segitiga
+    tris = decimate_grid(Z, tol)
+    keys = tris[..., 0] * Z.shape[1] + tris[..., 1]
+    uniq, inv = np.unique(keys, return_inverse=True)
+    rows, cols = np.divmod(uniq, Z.shape[1])
+    values = Z[rows, cols]
+    positions = np.column_stack((xi_lin[cols], yi_lin[rows], values * z_scale))
+    return positions, values, inv.reshape(-1, 3).astype(np.uint32)
+
+
+def to_obj(positions, colors, triangles):
+    # OBJ dengan warna vertex ("v x y z r g b"), indeks mulai dari 1
+    v = np.column_stack((positions, colors[:, :3]))
+    lines = ["# mesh dari grid interpolasi"]
+    lines.append("\n".join(map("v {:.6f} {:.6f} {:.6f} {:.4f} {:.4f} {:.4f}".format, *v.T)))
+    lines.append("\n".join(map("f {} {} {}".format, *(triangles + 1).T)))
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+def to_glb(positions, colors, triangles):
+    # glTF 2.0 biner (.glb). Y-up: (x, y, z) dunia -> (x, z, -y). Posisi dikurangi
+    # titik tengah (presisi float32 untuk koordinat UTM), offset disimpan di node
+    center = (positions.min(axis=0) + positions.max(axis=0)) / 2
+    local = positions - center
+    pos = np.column_stack((local[:, 0], local[:, 2], -local[:, 1])).astype(np.float32)
+    col = np.round(np.clip(colors[:, :3], 0, 1) * 255).astype(np.uint8)
+    col = np.column_stack((col, np.full(len(col), 255, dtype=np.uint8)))
+    idx = np.ascontiguousarray(triangles, dtype=np.uint32)
+
+    blobs = [pos.tobytes(), col.tobytes(), idx.tobytes()]
+    offsets = np.concatenate([[0], np.cumsum([len(b) for b in blobs])])
+    gltf = {
+        "asset": {"version": "2.0", "generator": "callista"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "translation": [float(center[0]), float(center[2]), float(-center[1])]}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "COLOR_0": 1}, "indices": 2, "mode": 4}]}],
+        "buffers": [{"byteLength": int(offsets[-1])}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": int(offsets[0]), "byteLength": len(blobs[0]), "target": 34962},
+            {"buffer": 0, "byteOffset": int(offsets[1]), "byteLength": len(blobs[1]), "target": 34962},
+            {"buffer": 0, "byteOffset": int(offsets[2]), "byteLength": len(blobs[2]), "target": 34963},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(pos), "type": "VEC3",
+             "min": pos.min(axis=0).tolist(), "max": pos.max(axis=0).tolist()},
+            {"bufferView": 1, "componentType": 5121, "normalized": True, "count": len(col), "type": "VEC4"},
+            {"bufferView": 2, "componentType": 5125, "count": idx.size, "type": "SCALAR"},
+        ],
+    }
+    # Semua blok sudah kelipatan 4 byte (float32, RGBA uint8, uint32)
+    bin_chunk = b"".join(blobs)
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return b"".join([
+        struct.pack("<III", 0x46546C67, 2, total),
+        struct.pack("<II", len(json_chunk), 0x4E4F534A), json_chunk,
+        struct.pack("<II", len(bin_chunk), 0x004E4942), bin_chunk,
+    ])
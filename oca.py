@@ -1,7 +1,7 @@
 import streamlit as st
 import numpy as np
-from scipy.interpolate import griddata
-import matplotlib.pyplot as plt
+import warmup
+from array_store import STORE
 
 # Set the page configuration for the Streamlit app
 st.set_page_config(
@@ -15,6 +15,9 @@ st.write("Aplikasi ini memvisualisasikan anomali data survei medan potensi denga
 # File Uploader
 uploaded_file = st.file_uploader("Unggah file CSV Anda", type=["csv"])
 
+# Opsional (CALLISTA_WARMUP=1): import modul berat di latar belakang
+warmup.start()
+
 if uploaded_file is not None:
     try:
         # Read the uploaded file. Streamlit's file_uploader provides a file-like object.
@@ -30,8 +33,9 @@ if uploaded_file is not None:
             st.write("First 5 rows of data:")
             st.dataframe(survey_data[:5]) # Use st.dataframe for better display in Streamlit
 
-            # Store data in session state to persist across reruns
-            st.session_state['survey_data'] = survey_data
+            # Session state hanya menyimpan handle; array-nya ada di store bersama,
+            # jadi survei yang sama dari beberapa sesi hanya disimpan sekali
+            st.session_state['survey_data'] = STORE.put(survey_data)
 
     except Exception as e:
         st.error(f"Terjadi kesalahan saat memuat data dari file: {e}")
@@ -41,7 +45,10 @@ else:
 # Extract X, Y, and Value columns (only if data is loaded)
 if 'survey_data' in st.session_state and st.session_state['survey_data'] is not None:
     try:
-        survey_data = st.session_state['survey_data']
+        survey_handle = st.session_state['survey_data']
+        survey_data = STORE.get(survey_handle)
+        if survey_data is None:
+            raise LookupError("data survei sudah dilepas dari memori bersama, unggah ulang file")
 
         # Extract X, Y, and value columns
         x = survey_data[:, 0]
@@ -53,10 +60,10 @@ if 'survey_data' in st.session_state and st.session_state['survey_data'] is not
         # st.write(f"Y coordinates (first 5): {y[:5]}") # Commented out for cleaner app
         # st.write(f"Values (first 5): {values[:5]}") # Commented out for cleaner app
 
-        # Store extracted data in session state for later use
-        st.session_state['x'] = x
-        st.session_state['y'] = y
-        st.session_state['values'] = values
+        # Store extracted data in session state for later use (handle ke kolom, tanpa salinan)
+        st.session_state['x'] = STORE.view(survey_handle, (slice(None), 0))
+        st.session_state['y'] = STORE.view(survey_handle, (slice(None), 1))
+        st.session_state['values'] = STORE.view(survey_handle, (slice(None), 2))
 
     except IndexError:
         st.error("File CSV yang diunggah tidak memiliki 3 kolom (X, Y, Value) yang diharapkan.")
@@ -66,27 +73,37 @@ if 'survey_data' in st.session_state and st.session_state['survey_data'] is not
 # Perform Grid Interpolation (only if X, Y, values are extracted)
 if 'x' in st.session_state and 'y' in st.session_state and 'values' in st.session_state:
     try:
-        x = st.session_state['x']
-        y = st.session_state['y']
-        values = st.session_state['values']
+        # Import ditunda sampai data tersedia
+        from scipy.interpolate import griddata
+
+        handles = [st.session_state[k] for k in ('x', 'y', 'values')]
+        # Grid hasil interpolasi dikunci dari isi inputnya: sesi lain dengan survei yang
+        # sama memakai grid yang sudah ada tanpa griddata ulang
+        grid_key = "griddata:linear:100:" + ":".join(f"{h.key}{h.index}" for h in handles)
+        grid_handles = [STORE.lookup(f"{grid_key}:{k}") for k in ('x', 'y', 'z')]
+
+        if any(STORE.get(h) is None for h in grid_handles):
+            x, y, values = (STORE.get(h) for h in handles)
+            if x is None or y is None or values is None:
+                raise LookupError("data survei sudah dilepas dari memori bersama, unggah ulang file")
+
+            # Create a regular grid for interpolation
+            xi = np.linspace(x.min(), x.max(), 100) # 100 points for X-axis
+            yi = np.linspace(y.min(), y.max(), 100) # 100 points for Y-axis
 
-        # Create a regular grid for interpolation
-        xi = np.linspace(x.min(), x.max(), 100) # 100 points for X-axis
-        yi = np.linspace(y.min(), y.max(), 100) # 100 points for Y-axis
+            grid_x, grid_y = np.meshgrid(xi, yi)
 
-        grid_x, grid_y = np.meshgrid(xi, yi)
+            # Perform grid interpolation
+            points = np.vstack((x, y)).T
+            grid_z = griddata(points, values, (grid_x, grid_y), method='linear')
 
-        # Perform grid interpolation
-        points = np.vstack((x, y)).T
-        grid_z = griddata(points, values, (grid_x, grid_y), method='linear')
+            grid_handles = [STORE.put(g, f"{grid_key}:{k}") for g, k in ((grid_x, 'x'), (grid_y, 'y'), (grid_z, 'z'))]
 
         st.success("Interpolasi grid berhasil dilakukan.")
         # st.write(f"Shape of interpolated grid_z: {grid_z.shape}") # Commented out for cleaner app
 
         # Store interpolated data in session state for later use
-        st.session_state['grid_x'] = grid_x
-        st.session_state['grid_y'] = grid_y
-        st.session_state['grid_z'] = grid_z
+        st.session_state['grid_x'], st.session_state['grid_y'], st.session_state['grid_z'] = grid_handles
 
     except Exception as e:
         st.error(f"Terjadi kesalahan saat melakukan interpolasi grid: {e}")
@@ -94,9 +111,11 @@ if 'x' in st.session_state and 'y' in st.session_state and 'values' in st.sessio
 # Visualize the Interpolated Data (only if grid_x, grid_y, grid_z are available)
 if 'grid_x' in st.session_state and 'grid_y' in st.session_state and 'grid_z' in st.session_state:
     try:
-        grid_x = st.session_state['grid_x']
-        grid_y = st.session_state['grid_y']
-        grid_z = st.session_state['grid_z']
+        import matplotlib.pyplot as plt
+
+        grid_x, grid_y, grid_z = (STORE.get(st.session_state[k]) for k in ('grid_x', 'grid_y', 'grid_z'))
+        if grid_x is None or grid_y is None or grid_z is None:
+            raise LookupError("grid sudah dilepas dari memori bersama, muat ulang halaman")
 
         st.subheader("Visualisasi Peta Kontur")
 
@@ -123,3 +142,11 @@ if 'grid_x' in st.session_state and 'grid_y' in st.session_state and 'grid_z' in
         st.error(f"Terjadi kesalahan saat membuat peta kontur: {e}")
 else:
     st.info("Unggah file CSV, ekstrak data, dan lakukan interpolasi terlebih dahulu untuk melihat visualisasi.")
+
+# Pemakaian memori bersama (semua sesi di proses server ini)
+usage = STORE.usage()
+st.sidebar.caption(
+    f"Memori bersama: {usage['bytes'] / 2**20:.1f} / {usage['budget_bytes'] / 2**20:.0f} MB, "
+    f"{usage['entries']} array, {usage['handles']} handle aktif, "
+    f"hit {usage['hits']} / miss {usage['misses']}, dibuang {usage['evictions']}"
+)
@@ -1,14 +1,22 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-from scipy.interpolate import griddata
+import warmup
 
 st.title("Visualisasi Medan Potensial (Grid Interpolation & Peta Anomali)")
 
 # --- Upload CSV ---
 uploaded_file = st.file_uploader("Upload file CSV (X, Y, Nilai)", type=["csv"])
 
+# Opsional (CALLISTA_WARMUP=1): import modul berat di latar belakang
+warmup.start()
+
 if uploaded_file is not None:
+    # Import modul berat ditunda sampai ada file
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    from scipy.interpolate import griddata
+    from despike_ui import qc_spike_section
+
     # Baca CSV
     data = pd.read_csv(uploaded_file)
 
@@ -26,6 +34,12 @@ if uploaded_file is not None:
     Y = data['Y'].values
     Z = data['Nilai'].values
 
+    # --- QC spike sebelum interpolasi ---
+    spikes, qc_mode = qc_spike_section(data, X, Y, Z)
+    spike_X, spike_Y = X[spikes], Y[spikes]
+    if qc_mode == "Buang":
+        X, Y, Z = X[~spikes], Y[~spikes], Z[~spikes]
+
     # --- Membuat grid ---
     grid_x, grid_y = np.mgrid[min(X):max(X):200j, min(Y):max(Y):200j]
 
@@ -36,6 +50,9 @@ if uploaded_file is not None:
     fig1, ax1 = plt.subplots(figsize=(7, 6))
     contour = ax1.contourf(grid_x, grid_y, grid_z, levels=20)
     plt.colorbar(contour, ax=ax1, label="Nilai")
+    if len(spike_X):
+        ax1.scatter(spike_X, spike_Y, c='r', marker='x', s=30, label="Spike (QC)")
+        ax1.legend()
     ax1.set_xlabel("X")
     ax1.set_ylabel("Y")
     ax1.set_title("Kontur Anomali (Interpolasi Grid)")
@@ -0,0 +1,138 @@
+import numpy as np
+
+ICON = "http://maps.google.com/mapfiles/kml/shapes/placemark_circle.png"
+
+
+def kml_colors(values, vmin, vmax, alpha=200):
+    # Versi vektor dari value_to_rgb_hex + rgb_hex_to_kml_color di tolongyaallah_app.py
+    # (biru -> putih -> merah), hasil berupa string KML aabbggrr
+    values = np.asarray(values, dtype=float)
+    t = (values - vmin) / (vmax - vmin) if vmax > vmin else np.full(values.shape, 0.5)
+    # NaN -> t = 0.5, yaitu putih seperti di versi skalar
+    t = np.where(np.isnan(t), 0.5, t)
+    # Nilai stasiun bisa di luar rentang grid (puncak di antara node, overshoot cubic)
+    t = np.clip(t, 0, 1)
+    low = t < 0.5
+    r = np.where(low, 255 * (t / 0.5), 255).astype(int)
+    g = np.where(low, 255 * (t / 0.5), 255 * (1 - (t - 0.5) / 0.5)).astype(int)
+    b = np.where(low, 255, 255 * (1 - (t - 0.5) / 0.5)).astype(int)
+    return np.array([f"{alpha:02x}{bb:02x}{gg:02x}{rr:02x}" for rr, gg, bb in zip(r, g, b)])
+
+
+def quadtree_levels(x, y, v, capacity=256, max_depth=12):
+    # Quadtree adaptif, dibangun satu pass vektor per level:
+    # sel dengan titik > capacity menjadi cluster dan dipecah di level berikutnya,
+    # sel lain menjadi daun yang berisi titik mentah.
+    xmin, xmax = float(x.min()), float(x.max())
+    ymin, ymax = float(y.min()), float(y.max())
+    w = (xmax - xmin) or 1e-9
+    h = (ymax - ymin) or 1e-9
+    idx = np.arange(len(x))
+    levels = []
+    for depth in range(max_depth + 1):
+        n = 1 << depth
+        ix = np.minimum(((x[idx] - xmin) / w * n).astype(np.int64), n - 1)
+        iy = np.minimum(((y[idx] - ymin) / h * n).astype(np.int64), n - 1)
+        cells, inv, counts = np.unique(iy * n + ix, return_inverse=True, return_counts=True)
+        inv = inv.ravel()
+        split = counts > capacity if depth < max_depth else np.zeros(len(cells), dtype=bool)
+
+        # Titik daun diurutkan per sel supaya bisa dipotong per Region
+        leaf = ~split[inv]
+        order = np.argsort(inv[leaf], kind='stable')
+        finite = np.isfinite(v[idx])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (np.bincount(inv, weights=np.where(finite, v[idx], 0), minlength=len(cells))
+                    / np.bincount(inv, weights=finite, minlength=len(cells)))
+        levels.append({
+            'depth': depth,
+            'n': n,
+            'ix': cells % n,
+            'iy': cells // n,
+            'count': counts,
+            'mean': mean,
+            'cx': np.bincount(inv, weights=x[idx], minlength=len(cells)) / counts,
+            'cy': np.bincount(inv, weights=y[idx], minlength=len(cells)) / counts,
+            'cluster': split,
+            'leaf_points': idx[leaf][order],
+        })
+        idx = idx[~leaf]
+        if idx.size == 0:
+            break
+    return levels, (xmin, xmax, ymin, ymax)
+
+
+def _region(west, east, south, north, min_lod, max_lod):
+    return (f"<Region><LatLonAltBox><north>{north}</north><south>{south}</south>"
+            f"<east>{east}</east><west>{west}</west></LatLonAltBox>"
+            f"<Lod><minLodPixels>{min_lod}</minLodPixels><maxLodPixels>{max_lod}</maxLodPixels></Lod></Region>")
+
+
+def _kml_header(name, description):
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n'
+            f"<name>{name}</name>\n<description>{description}</description>\n")
+
+
+def _styles(prefix, palette, keys, scale):
+    return "".join(f'<Style id="{prefix}{k}"><IconStyle><color>{palette[k]}</color><scale>{scale}</scale>'
+                   f'<Icon><href>{ICON}</href></Icon></IconStyle></Style>\n' for k in keys)
+
+
+def lod_kml_files(x, y, v, vmin, vmax, capacity=256, max_depth=12, min_lod=128, name="Pemetaan Medan Potensial"):
+    # Isi KMZ: {nama file: teks KML}. doc.kml hanya berisi cluster quadtree; tiap cluster tampil
+    # saat selnya berukuran [min_lod, 2*min_lod) piksel, saat diperbesar sel anaknya yang aktif.
+    # Titik mentah tiap sel daun ada di cells/<depth>_<iy>_<ix>.kml yang dimuat lewat
+    # <NetworkLink> di dalam <Region> sel itu, jadi baru di-parse saat selnya terlihat
+    levels, (xmin, xmax, ymin, ymax) = quadtree_levels(x, y, v, capacity, max_depth)
+    w = (xmax - xmin) or 1e-9
+    h = (ymax - ymin) or 1e-9
+
+    # Style dipakai bersama lewat styleUrl, bukan <Style> inline per placemark
+    point_colors = kml_colors(v, vmin, vmax)
+    cluster_means = np.concatenate([lv['mean'][lv['cluster']] for lv in levels])
+    cluster_colors = kml_colors(cluster_means, vmin, vmax, alpha=230)
+    palette, style_idx = np.unique(np.concatenate([point_colors, cluster_colors]), return_inverse=True)
+    point_style = style_idx[:len(v)]
+    cluster_style = style_idx[len(v):]
+
+    files = {}
+    out = [_kml_header(name, f"Cluster LOD (quadtree), {len(v)} titik"),
+           _styles("c", palette, np.unique(cluster_style), 1.2)]
+    c_pos = 0
+    for lv in levels:
+        n = lv['n']
+        cw, ch = w / n, h / n
+        west = xmin + lv['ix'] * cw
+        south = ymin + lv['iy'] * ch
+        lod_min = 0 if lv['depth'] == 0 else min_lod
+        leaf_counts = np.where(lv['cluster'], 0, lv['count'])
+        leaf_bounds = np.concatenate([[0], np.cumsum(leaf_counts)])
+
+        out.append(f"<Folder><name>Level {lv['depth']}</name>\n")
+        for c in range(len(lv['count'])):
+            if lv['cluster'][c]:
+                region = _region(west[c], west[c] + cw, south[c], south[c] + ch, lod_min, 2 * min_lod)
+                out.append(
+                    f"<Folder>{region}<Placemark><name>{lv['count'][c]}</name>"
+                    f"<description>Jumlah titik: {lv['count'][c]}, Rata-rata: {lv['mean'][c]:.4g}</description>"
+                    f"<styleUrl>#c{cluster_style[c_pos]}</styleUrl>"
+                    f"<Point><coordinates>{lv['cx'][c]},{lv['cy'][c]},0</coordinates></Point></Placemark></Folder>\n")
+                c_pos += 1
+            else:
+                region = _region(west[c], west[c] + cw, south[c], south[c] + ch, lod_min, -1)
+                href = f"cells/{lv['depth']}_{lv['iy'][c]}_{lv['ix'][c]}.kml"
+                out.append(f"<NetworkLink><name>{lv['count'][c]} titik</name>{region}"
+                           f"<Link><href>{href}</href><viewRefreshMode>onRegion</viewRefreshMode></Link></NetworkLink>\n")
+                pts = lv['leaf_points'][leaf_bounds[c]:leaf_bounds[c + 1]]
+                # Tiap file sel membawa style yang dipakainya sendiri (styleUrl antar file tidak andal)
+                cell = [_kml_header(f"Sel {lv['depth']}/{lv['iy'][c]}/{lv['ix'][c]}", f"{len(pts)} titik"),
+                        _styles("p", palette, np.unique(point_style[pts]), 0.6)]
+                for p in pts:
+                    cell.append(f"<Placemark><name>{v[p]}</name><styleUrl>#p{point_style[p]}</styleUrl>"
+                                f"<Point><coordinates>{x[p]},{y[p]},0</coordinates></Point></Placemark>\n")
+                cell.append("</Document>\n</kml>\n")
+                files[href] = "".join(cell)
+        out.append("</Folder>\n")
+    out.append("</Document>\n</kml>\n")
+    files["doc.kml"] = "".join(out)
+    return files
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from scipy.ndimage import binary_dilation, distance_transform_edt, map_coordinates
+
+# Sel tambahan di tiap sisi grid untuk sampling bikubik (pengaruh syarat batas meluruh ~0.27^n)
+SPLINE_PAD = 12
+
+
+def parse_polylines(text):
+    # Satu profil per baris: "x1,y1; x2,y2; x3,y3"
+    polylines = []
+    for line in text.strip().splitlines():
+        if not line.strip():
+            continue
+        vertices = [[float(v) for v in pt.replace(',', ' ').split()] for pt in line.split(';') if pt.strip()]
+        if len(vertices) < 2 or any(len(v) != 2 for v in vertices):
+            raise ValueError(f"Profil tidak valid: {line.strip()!r}")
+        polylines.append(np.array(vertices))
+    return polylines
+
+
+def polylines_from_table(df):
+    # Tabel titik sudut: kolom id profil (kolom pertama selain X/Y), X, Y
+    xi = [c for c in df.columns if c.lower().startswith('x')][0]
+    yi = [c for c in df.columns if c.lower().startswith('y')][0]
+    pid = [c for c in df.columns if c not in (xi, yi)][0]
+    return [g[[xi, yi]].to_numpy(dtype=float) for _, g in df.groupby(pid, sort=False)]
+
+
+def densify(polylines, step):
+    # Semua profil di-resample sekaligus: chainage tiap profil digeser ke rentangnya
+    # sendiri sehingga satu np.interp melayani semua profil
+    verts = np.concatenate(polylines)
+    n_verts = np.array([len(p) for p in polylines])
+    pid_v = np.repeat(np.arange(len(polylines)), n_verts)
+    seg = np.linalg.norm(np.diff(verts, axis=0), axis=1)
+    seg[np.cumsum(n_verts)[:-1] - 1] = 0  # tidak ada segmen antar profil
+    chain = np.concatenate([[0], np.cumsum(seg)])
+    start = chain[np.cumsum(n_verts) - n_verts]
+    length = chain[np.cumsum(n_verts) - 1] - start
+
+    # Offset agar rentang chainage antar profil tidak bersinggungan
+    gap = np.arange(len(polylines)) * (step + 1.0)
+    chain_g = chain + gap[pid_v]
+    n_samples = np.floor(length / step).astype(int) + 1
+    pid_s = np.repeat(np.arange(len(polylines)), n_samples)
+    first = np.cumsum(n_samples) - n_samples
+    dist = (np.arange(n_samples.sum()) - first[pid_s]) * step
+    # Titik akhir tiap profil selalu ikut disampel
+    dist = np.append(dist, length)
+    pid_s = np.append(pid_s, np.arange(len(polylines)))
+    order = np.lexsort((dist, pid_s))
+    dist, pid_s = dist[order], pid_s[order]
+    keep = np.ones(len(dist), dtype=bool)
+    keep[1:] = (pid_s[1:] != pid_s[:-1]) | (dist[1:] - dist[:-1] > 1e-9 * step)
+    dist, pid_s = dist[keep], pid_s[keep]
+
+    target = start[pid_s] + gap[pid_s] + dist
+    x = np.interp(target, chain_g, verts[:, 0])
+    y = np.interp(target, chain_g, verts[:, 1])
+    return pid_s, dist, x, y
+
+
+def sample_grid(ZI, extent, x, y, order=1):
+    # Koordinat dunia -> indeks pecahan grid (baris = Y, kolom = X)
+    xmin, xmax, ymin, ymax = extent
+    ny, nx = ZI.shape
+    cols = (x - xmin) / (xmax - xmin) * (nx - 1)
+    rows = (y - ymin) / (ymax - ymin) * (ny - 1)
+    outside = (rows < 0) | (rows > ny - 1) | (cols < 0) | (cols > nx - 1)
+    nan = np.isnan(ZI)
+    if nan.any():
+        # Spline bikubik menyebarkan NaN ke seluruh grid: isi dulu dengan nilai valid
+        # terdekat, lalu buang sampel yang jejak interpolasinya menyentuh sel NaN
+        # (jejak bikubik lebih lebar 2 sel dari bilinear)
+        idx = distance_transform_edt(nan, return_distances=False, return_indices=True)
+        filled = ZI[tuple(idx)]
+        touched = binary_dilation(nan, iterations=2, structure=np.ones((3, 3), bool)) if order > 1 else nan
+        outside |= map_coordinates(touched.astype(float), np.vstack((rows, cols)), order=1, mode='nearest') > 0
+    else:
+        filled = ZI
+    if order > 1:
+        # Perpanjang grid secara linear (refleksi ganjil) sebelum prefilter spline, supaya
+        # syarat batas tidak membengkokkan permukaan di dekat tepi grid
+        filled = np.pad(filled, SPLINE_PAD, mode='reflect', reflect_type='odd')
+        rows, cols = rows + SPLINE_PAD, cols + SPLINE_PAD
+    values = map_coordinates(filled, np.vstack((rows, cols)), order=order, mode='nearest')
+    values[outside] = np.nan
+    return values
+
+
+def extract_profiles(ZI, extent, polylines, step, order=1):
+    pid, dist, x, y = densify(polylines, step)
+    values = sample_grid(ZI, extent, x, y, order)
+    return pd.DataFrame({'Profil': pid + 1, 'Jarak': dist, 'X': x, 'Y': y, 'Value': values})
+
+
+def profiles_kml(profiles):
+    placemarks = []
+    for pid, g in profiles.groupby('Profil'):
+        coords = " ".join(f"{x},{y},0" for x, y in zip(g['X'], g['Y']))
+        placemarks.append(f"""
+  <Placemark>
+    <name>Profil {pid}</name>
+    <description>Panjang: {g['Jarak'].iloc[-1]:.6g}, Min: {g['Value'].min():.6g}, Maks: {g['Value'].max():.6g}</description>
+    <Style><LineStyle><color>ff00ffff</color><width>2</width></LineStyle></Style>
+    <LineString>
+      <tessellate>1</tessellate>
+      <coordinates>{coords}</coordinates>
+    </LineString>
+  </Placemark>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+  <name>Profil Penampang</name>{''.join(placemarks)}
+</Document>
+</kml>
+"""
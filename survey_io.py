@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+
+# Ekstensi yang diterima st.file_uploader
+SURVEY_TYPES = ["csv", "parquet", "feather", "arrow", "npz"]
+
+
+# Kolom id lintasan (opsional), dipakai QC median bergerak per lintasan
+LINE_PREFIXES = ('line', 'lintasan', 'jalur')
+
+
+class ColumnError(ValueError):
+    pass
+
+
+def detect_columns(names):
+    # Aturan yang sama dengan callista.py: kolom diawali x, y, dan v/value/z
+    try:
+        xi = [c for c in names if c.lower().startswith('x')][0]
+        yi = [c for c in names if c.lower().startswith('y')][0]
+        vi = [c for c in names if (c.lower().startswith('v') or c.lower().startswith('value') or c.lower().startswith('z'))][0]
+    except IndexError:
+        raise ColumnError("File harus punya kolom X, Y, dan Value.") from None
+    return xi, yi, vi
+
+
+def detect_line_column(names):
+    found = [c for c in names if c.lower().startswith(LINE_PREFIXES)]
+    return found[0] if found else None
+
+
+def _with_line(cols, names, line):
+    # Kolom yang dibaca: X, Y, Value (+ id lintasan kalau diminta dan ada)
+    lc = detect_line_column(names) if line else None
+    return list(cols) + ([lc] if lc else [])
+
+
+def _as_float(arr):
+    # Tanpa salinan kalau data sudah float64
+    return np.asarray(arr, dtype=float)
+
+
+def _arrow_source(f):
+    import pyarrow as pa
+    if isinstance(f, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(f))
+    # UploadedFile Streamlit adalah BytesIO: bungkus buffernya tanpa menyalin
+    if hasattr(f, 'getbuffer'):
+        return pa.BufferReader(pa.py_buffer(f.getbuffer()))
+    return pa.BufferReader(f.read())
+
+
+def _read_csv(f, line):
+    import pandas as pd
+    names = pd.read_csv(f, nrows=0).columns
+    cols = detect_columns(names)
+    use = _with_line(cols, names, line)
+    if hasattr(f, 'seek'):
+        f.seek(0)
+    df = pd.read_csv(f, usecols=use)
+    return [df[c].to_numpy() for c in use], cols
+
+
+def _read_parquet(f, line):
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(_arrow_source(f))
+    names = pf.schema_arrow.names
+    cols = detect_columns(names)
+    use = _with_line(cols, names, line)
+    # Hanya kolom yang dipakai yang didekode dari file
+    table = pf.read(columns=use)
+    return [table.column(c).to_numpy() for c in use], cols
+
+
+def _read_feather(f, line):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    names = pa.ipc.open_file(_arrow_source(f)).schema.names
+    cols = detect_columns(names)
+    use = _with_line(cols, names, line)
+    # Feather tanpa kompresi dibaca zero-copy dari buffer
+    table = feather.read_table(_arrow_source(f), columns=use)
+    return [table.column(c).to_numpy() for c in use], cols
+
+
+def _read_npz(f, line):
+    # Array di dalam .npz dimuat per kunci, jadi hanya array yang dipakai yang dibaca
+    with np.load(f, allow_pickle=False) as npz:
+        try:
+            cols = detect_columns(npz.files)
+            return [npz[c] for c in _with_line(cols, npz.files, line)], cols
+        except ColumnError:
+            # Satu array 2-D (n, >=3): kolom 0, 1, 2 = X, Y, Value
+            if len(npz.files) != 1:
+                raise
+            data = npz[npz.files[0]]
+            if data.ndim != 2 or data.shape[1] < 3:
+                raise
+            return [data[:, 0], data[:, 1], data[:, 2]], ('X', 'Y', 'Value')
+
+
+_READERS = {
+    '.csv': _read_csv,
+    '.parquet': _read_parquet,
+    '.feather': _read_feather,
+    '.arrow': _read_feather,
+    '.npz': _read_npz,
+}
+
+
+def read_survey(f, line=False):
+    # Kembalikan x, y, value (float64) dan nama kolom asal.
+    # line=True: juga id lintasan (None kalau tidak ada kolomnya) sebelum nama kolom
+    name = f if isinstance(f, (str, os.PathLike)) else getattr(f, 'name', '')
+    ext = os.path.splitext(os.fspath(name))[1].lower() or '.csv'
+    if ext not in _READERS:
+        raise ValueError(f"Format file {ext} tidak didukung.")
+    arrays, cols = _READERS[ext](f, line)
+    x, y, val = (_as_float(a) for a in arrays[:3])
+    if not line:
+        return x, y, val, cols
+    return x, y, val, (arrays[3] if len(arrays) > 3 else None), cols
@@ -1,17 +1,24 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import griddata
 import io
 import zipfile
 import urllib.parse
+import warmup
+from survey_io import SURVEY_TYPES
 
 st.set_page_config(layout="wide", page_title="Pemetaan Medan Potensial")
 st.title("Aplikasi Pemetaan Medan Potensial - Kontur & Heatmap")
-st.write("Upload CSV berisi kolom: X, Y, Value (separator koma).")
+st.write("Upload CSV (separator koma), Parquet, Feather/Arrow atau NPZ berisi kolom: X, Y, Value.")
 
-uploaded_file = st.file_uploader("Upload file CSV", type=["csv"]) 
+uploaded_file = st.file_uploader("Upload file survei", type=SURVEY_TYPES) 
+
+# Optional (CALLISTA_WARMUP=1): pre-import heavy modules in the background
+warmup.start()
+
+# Mask dihitung sekali per survei + geometri grid, lalu dipakai ulang di setiap rerun
+@st.cache_data(max_entries=8)
+def cached_mask(points, XI, YI, kind, max_dist):
+    return build_mask(points, XI, YI, kind == 'Concave hull', max_dist)
 
 # Helper: value -> RGB (as hex rrggbb)
 def value_to_rgb_hex(v, vmin, vmax):
@@ -44,26 +51,20 @@ def rgb_hex_to_kml_color(hexrgb, alpha=255):
     return a + b + g + r
 
 if uploaded_file is not None:
-    try:
-        df = pd.read_csv(uploaded_file)
-    except Exception as e:
-        st.error(f"Gagal membaca CSV: {e}")
-        st.stop()
+    # Heavy imports are deferred until a file is uploaded (fast first page load)
+    import matplotlib.pyplot as plt
+    from survey_io import ColumnError, read_survey
+    from grid_mask import build_mask, interpolate_masked
 
-    # Check columns
-    cols = [c.lower() for c in df.columns]
-    # find X,Y,Value columns
+    # Read only the X, Y, Value columns (CSV, Parquet, Feather/Arrow, NPZ)
     try:
-        xi = [c for c in df.columns if c.lower().startswith('x')][0]
-        yi = [c for c in df.columns if c.lower().startswith('y')][0]
-        vi = [c for c in df.columns if (c.lower().startswith('v') or c.lower().startswith('value') or c.lower().startswith('z'))][0]
-    except Exception:
-        st.error('CSV harus punya kolom X, Y, Value (nama kolom bebas, minimal mengandung X, Y, dan Value/Z).')
+        x, y, val, (xi, yi, vi) = read_survey(uploaded_file)
+    except ColumnError:
+        st.error('File harus punya kolom X, Y, Value (nama kolom bebas, minimal mengandung X, Y, dan Value/Z).')
+        st.stop()
+    except Exception as e:
+        st.error(f"Gagal membaca file: {e}")
         st.stop()
-
-    x = df[xi].astype(float).values
-    y = df[yi].astype(float).values
-    val = df[vi].astype(float).values
 
     # Grid resolution (adjustable)
     col1, col2 = st.columns([1,3])
@@ -72,6 +73,9 @@ if uploaded_file is not None:
         method = st.selectbox('Metode interpolasi', ['linear', 'cubic', 'nearest'])
         show_contour = st.checkbox('Tampilkan kontur', value=True)
         show_heatmap = st.checkbox('Tampilkan heatmap (imshow)', value=True)
+        mask_kind = st.selectbox('Mask sel jauh dari data', ['Tidak ada', 'Jarak KD-tree', 'Concave hull'])
+        if mask_kind != 'Tidak ada':
+            max_dist = st.number_input('Jarak maks ke stasiun / sisi hull (0 = otomatis)', min_value=0.0, value=0.0, format="%g")
 
     # Create grid
     xmin, xmax = x.min(), x.max()
@@ -81,19 +85,29 @@ if uploaded_file is not None:
     XI, YI = np.meshgrid(xi_lin, yi_lin)
     points = np.column_stack((x, y))
 
+    # Mask: sel yang jauh dari stasiun tidak dikirim ke interpolator
+    if mask_kind == 'Tidak ada':
+        mask = np.ones(XI.shape, dtype=bool)
+    else:
+        mask, used_hull = cached_mask(points, XI, YI, mask_kind, max_dist)
+        with col1:
+            if mask_kind == 'Concave hull' and not used_hull:
+                st.warning('Concave hull tidak bisa dibuat (stasiun segaris/degenerate); dipakai mask jarak KD-tree.')
+            st.caption(f"Sel diinterpolasi: {mask.sum()} dari {mask.size} ({100 * mask.mean():.0f}%)")
+
     # Interpolate
     try:
-        ZI = griddata(points, val, (XI, YI), method=method)
+        ZI = interpolate_masked(points, val, XI, YI, mask, method=method)
     except Exception as e:
         st.warning(f'Griddata error: {e}. Falling back to nearest.')
-        ZI = griddata(points, val, (XI, YI), method='nearest')
+        ZI = interpolate_masked(points, val, XI, YI, mask, method='nearest')
 
     # Plot
     with col2:
         fig, ax = plt.subplots(figsize=(8,6))
         # Handle case where ZI is all NaN (very unlikely but safe)
         if np.all(np.isnan(ZI)):
-            st.error("Interpolasi menghasilkan semua NaN. Coba ubah metode atau resolusi grid, atau periksa data input.")
+            st.error("Interpolasi menghasilkan semua NaN. Coba ubah metode, resolusi grid atau jarak mask, atau periksa data input.")
             st.stop()
         vmin = np.nanmin(ZI)
         vmax = np.nanmax(ZI)
@@ -122,13 +136,12 @@ if uploaded_file is not None:
     # ============================
     # SIMPAN HEATMAP SEBAGAI PNG (OVERLAY)
     # ============================
-    # Prepare array for saving: replace NaN with vmin to avoid imsave issues
-    img = np.flipud(ZI.copy())
-    img = np.nan_to_num(img, nan=vmin)
+    # NaN (di luar data / sel yang di-mask) dibiarkan transparan; vmin/vmax eksplisit
+    img = np.flipud(ZI)
 
     heat_buf = io.BytesIO()
     # Use matplotlib's imsave (specify format to ensure PNG)
-    plt.imsave(heat_buf, img, cmap='jet', format='png')
+    plt.imsave(heat_buf, img, cmap='jet', vmin=vmin, vmax=vmax, format='png')
     heat_buf.seek(0)
 
     # ============================
@@ -175,4 +188,4 @@ if uploaded_file is not None:
     st.success(" Heatmap siap dibuka di Google Earth Pro!")
 
 else:
-    st.info('Silakan upload file CSV untuk memulai.')
+    st.info('Silakan upload file survei untuk memulai.')
@@ -1,18 +1,20 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import griddata
 import io
 import zipfile
 import base64
 import urllib.parse
+import warmup
+from survey_io import SURVEY_TYPES
 
 st.set_page_config(layout="wide", page_title="Pemetaan Medan Potensial")
 st.title("Aplikasi Pemetaan Medan Potensial - Kontur & Heatmap")
-st.write("Upload CSV berisi kolom: X, Y, Value (separator koma).")
+st.write("Upload CSV (separator koma), Parquet, Feather/Arrow atau NPZ berisi kolom: X, Y, Value.")
 
-uploaded_file = st.file_uploader("Upload file CSV", type=["csv"]) 
+uploaded_file = st.file_uploader("Upload file survei", type=SURVEY_TYPES) 
+
+# Optional (CALLISTA_WARMUP=1): pre-import heavy modules in the background
+warmup.start()
 
 # Helper: value -> RGB (as hex rrggbb)
 def value_to_rgb_hex(v, vmin, vmax):
@@ -45,26 +47,21 @@ def rgb_hex_to_kml_color(hexrgb, alpha=255):
     return a + b + g + r
 
 if uploaded_file is not None:
-    try:
-        df = pd.read_csv(uploaded_file)
-    except Exception as e:
-        st.error(f"Gagal membaca CSV: {e}")
-        st.stop()
+    # Heavy imports are deferred until a file is uploaded (fast first page load)
+    import matplotlib.pyplot as plt
+    from scipy.interpolate import griddata
+    from survey_io import ColumnError, read_survey
+    from placemark_lod import lod_kml_files
 
-    # Check columns
-    cols = [c.lower() for c in df.columns]
-    # find X,Y,Value columns
+    # Read only the X, Y, Value columns (CSV, Parquet, Feather/Arrow, NPZ)
     try:
-        xi = [c for c in df.columns if c.lower().startswith('x')][0]
-        yi = [c for c in df.columns if c.lower().startswith('y')][0]
-        vi = [c for c in df.columns if (c.lower().startswith('v') or c.lower().startswith('value') or c.lower().startswith('z'))][0]
-    except Exception:
-        st.error('CSV harus punya kolom X, Y, Value (nama kolom bebas, minimal mengandung X, Y, dan Value/Z).')
+        x, y, val, (xi, yi, vi) = read_survey(uploaded_file)
+    except ColumnError:
+        st.error('File harus punya kolom X, Y, Value (nama kolom bebas, minimal mengandung X, Y, dan Value/Z).')
+        st.stop()
+    except Exception as e:
+        st.error(f"Gagal membaca file: {e}")
         st.stop()
-
-    x = df[xi].astype(float).values
-    y = df[yi].astype(float).values
-    val = df[vi].astype(float).values
 
     # Grid resolution (adjustable)
     col1, col2 = st.columns([1,3])
@@ -73,6 +70,12 @@ if uploaded_file is not None:
         method = st.selectbox('Metode interpolasi', ['linear', 'cubic', 'nearest'])
         show_contour = st.checkbox('Tampilkan kontur', value=True)
         show_heatmap = st.checkbox('Tampilkan heatmap (imshow)', value=True)
+        # Di atas ~50 ribu titik, KML datar membuat Google Earth macet
+        export_mode = st.selectbox('Mode ekspor placemark', ['Datar (semua titik)', 'Cluster LOD (quadtree)'],
+                                   index=1 if len(x) > 50000 else 0)
+        lod_mode = export_mode.startswith('Cluster')
+        if lod_mode:
+            lod_capacity = st.number_input('Maks titik per sel quadtree', 16, 5000, 256)
 
     # Create grid
     xmin, xmax = x.min(), x.max()
@@ -111,68 +114,81 @@ if uploaded_file is not None:
     fig.savefig(buf, format='png', bbox_inches='tight')
     buf.seek(0)
 
-    # Create KML (Point placemarks for each original point and optionally for grid centers)
-    kml_points = []
-    for xi_val, yi_val, v_val in zip(x, y, val):
-        hexrgb = value_to_rgb_hex(v_val, vmin, vmax)
-        kmlc = rgb_hex_to_kml_color(hexrgb, alpha=200)
-        desc = f"<![CDATA[Value: {v_val}]]>"
-        placemark = f"""
-        <Placemark>
-          <name>{v_val}</name>
-          <description>{desc}</description>
-          <Style>
-            <IconStyle>
-              <color>{kmlc}</color>
-              <scale>0.6</scale>
-              <Icon>
-                <href>http://maps.google.com/mapfiles/kml/shapes/placemark_circle.png</href>
-              </Icon>
-            </IconStyle>
-          </Style>
-          <Point><coordinates>{xi_val},{yi_val},0</coordinates></Point>
-        </Placemark>
+    if lod_mode:
+        # Quadtree: doc.kml hanya berisi cluster (jumlah & rata-rata); titik mentah tiap sel daun
+        # ada di file KML terpisah di dalam KMZ, dimuat lewat NetworkLink saat selnya terlihat
+        kml_files = lod_kml_files(x, y, val, vmin, vmax, capacity=int(lod_capacity))
+        kml_doc = kml_files.pop('doc.kml')
+    else:
+        # Create KML (Point placemarks for each original point and optionally for grid centers)
+        kml_points = []
+        for xi_val, yi_val, v_val in zip(x, y, val):
+            hexrgb = value_to_rgb_hex(v_val, vmin, vmax)
+            kmlc = rgb_hex_to_kml_color(hexrgb, alpha=200)
+            desc = f"<![CDATA[Value: {v_val}]]>"
+            placemark = f"""
+            <Placemark>
+              <name>{v_val}</name>
+              <description>{desc}</description>
+              <Style>
+                <IconStyle>
+                  <color>{kmlc}</color>
+                  <scale>0.6</scale>
+                  <Icon>
+                    <href>http://maps.google.com/mapfiles/kml/shapes/placemark_circle.png</href>
+                  </Icon>
+                </IconStyle>
+              </Style>
+              <Point><coordinates>{xi_val},{yi_val},0</coordinates></Point>
+            </Placemark>
+            """
+            kml_points.append(placemark)
+
+        # Create KML document string
+        kml_doc = f"""
+        <?xml version="1.0" encoding="UTF-8"?>
+        <kml xmlns="http://www.opengis.net/kml/2.2">
+        <Document>
+          <name>Pemetaan Medan Potensial</name>
+          <description>Generated by Streamlit app</description>
+          {''.join(kml_points)}
+        </Document>
+        </kml>
         """
-        kml_points.append(placemark)
-
-    # Create KML document string
-    kml_doc = f"""
-    <?xml version="1.0" encoding="UTF-8"?>
-    <kml xmlns="http://www.opengis.net/kml/2.2">
-    <Document>
-      <name>Pemetaan Medan Potensial</name>
-      <description>Generated by Streamlit app</description>
-      {''.join(kml_points)}
-    </Document>
-    </kml>
-    """
 
     # Make KMZ by zipping the KML and the PNG image (KMZ is just a zip with .kmz ext)
     kmz_bytes = io.BytesIO()
     with zipfile.ZipFile(kmz_bytes, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # write KML
+        # write KML (+ file sel quadtree di mode LOD)
         zf.writestr('doc.kml', kml_doc)
+        if lod_mode:
+            for arcname, text in kml_files.items():
+                zf.writestr(arcname, text)
         # write image
         zf.writestr('image.png', buf.getvalue())
     kmz_bytes.seek(0)
 
     # Provide download buttons
     st.download_button('Download PNG (peta)', data=buf, file_name='peta.png', mime='image/png')
-    st.download_button('Download KML (placemarks)', data=kml_doc.encode('utf-8'), file_name='peta_points.kml', mime='application/vnd.google-earth.kml+xml')
+    # Di mode LOD doc.kml merujuk file sel di dalam KMZ, jadi hanya KMZ yang lengkap
+    if not lod_mode:
+        st.download_button('Download KML (placemarks)', data=kml_doc.encode('utf-8'), file_name='peta_points.kml', mime='application/vnd.google-earth.kml+xml')
     st.download_button('Download KMZ (bisa dibuka di Google Earth)', data=kmz_bytes, file_name='peta.kmz', mime='application/vnd.google-earth.kmz')
 
-    # Provide direct data-URL link to KML (may open or download depending on browser)
-    kml_quoted = urllib.parse.quote(kml_doc)
-    data_url = f"data:application/vnd.google-earth.kml+xml;charset=utf-8,{kml_quoted}"
-    st.markdown(f"[Buka KML langsung (data URL) — klik kanan -> Open in new tab jika browser tidak otomatis mendownload]({data_url})")
+    # Link data URL tidak dibuat di mode LOD: isinya bisa puluhan MB
+    if not lod_mode:
+        # Provide direct data-URL link to KML (may open or download depending on browser)
+        kml_quoted = urllib.parse.quote(kml_doc)
+        data_url = f"data:application/vnd.google-earth.kml+xml;charset=utf-8,{kml_quoted}"
+        st.markdown(f"[Buka KML langsung (data URL) — klik kanan -> Open in new tab jika browser tidak otomatis mendownload]({data_url})")
 
-    # Attempt to create a Google Earth Web link (best-effort). Note: Google Earth Web may not accept raw KML via URL for large content.
-    ge_link = 'https://earth.google.com/web/search/?' + urllib.parse.urlencode({'kml': kml_doc})
-    st.markdown("---")
-    st.write("Jika ingin membuka di Google Earth Web: coba link berikut (jika tidak berhasil, gunakan tombol download KMZ lalu import di Google Earth):")
-    st.markdown(f"[Buka di Google Earth Web (best-effort)]({ge_link})")
+        # Attempt to create a Google Earth Web link (best-effort). Note: Google Earth Web may not accept raw KML via URL for large content.
+        ge_link = 'https://earth.google.com/web/search/?' + urllib.parse.urlencode({'kml': kml_doc})
+        st.markdown("---")
+        st.write("Jika ingin membuka di Google Earth Web: coba link berikut (jika tidak berhasil, gunakan tombol download KMZ lalu import di Google Earth):")
+        st.markdown(f"[Buka di Google Earth Web (best-effort)]({ge_link})")
 
     st.info('Catatan: Untuk pengalaman lengkap di Google Earth (desktop/web), lebih andal menggunakan file KMZ yang di-download lalu di-open/import ke Google Earth.')
 
 else:
-    st.info('Silakan upload file CSV untuk memulai.')
+    st.info('Silakan upload file survei untuk memulai.')
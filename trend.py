@@ -0,0 +1,113 @@
+import numpy as np
+
+CHUNK = 1_000_000
+HUBER_ITER = 3
+
+
+def _exponents(order):
+    # Suku u^i v^j dengan i + j <= order
+    return np.array([(i, t - i) for t in range(order + 1) for i in range(t, -1, -1)])
+
+
+def _normalize(x, bounds):
+    lo, hi = bounds
+    return 2.0 * (x - lo) / ((hi - lo) or 1.0) - 1.0
+
+
+def _powers(u, order):
+    # Baris k = u^k, dihitung dengan perkalian berulang (lebih cepat dari **)
+    P = np.empty((order + 1, len(u)))
+    P[0] = 1.0
+    for k in range(1, order + 1):
+        P[k] = P[k - 1] * u
+    return P
+
+
+def _design(u, v, order, exps):
+    # Matriks Vandermonde 2-D, disimpan transpose (n_suku, n_titik) supaya
+    # tiap suku adalah baris kontigu
+    return _powers(u, order)[exps[:, 0]] * _powers(v, order)[exps[:, 1]]
+
+
+def _robust_weights(r, scale, huber):
+    # Huber dulu (tidak pernah nol, aman kalau fit awal masih bias oleh outlier),
+    # lalu Tukey bisquare yang membuang outlier sepenuhnya
+    if huber:
+        return np.minimum(1.0, 1.345 * scale / np.maximum(np.abs(r), 1e-300))
+    t = r / (4.685 * scale)
+    return np.where(np.abs(t) < 1, (1 - t * t) ** 2, 0.0)
+
+
+def _mad_scale(r):
+    return 1.4826 * np.median(np.abs(r - np.median(r)))
+
+
+def _solve(u, v, z, order, exps, chunk, coef=None, huber=False):
+    # Persamaan normal diakumulasi per chunk, jadi memori tetap kecil untuk jutaan titik.
+    # Kalau coef diberikan: residual coef itu dihitung dulu, skala MAD diambil dari residual
+    # yang sama (bukan dari iterasi sebelumnya), lalu dipakai sebagai bobot robust (IRLS)
+    scale = None
+    if coef is not None:
+        r = z - _predict(u, v, coef, order, exps, chunk)
+        scale = _mad_scale(r)
+        if scale == 0:
+            return coef, scale
+    p = len(exps)
+    AtA = np.zeros((p, p))
+    Atb = np.zeros(p)
+    for s in range(0, len(z), chunk):
+        A = _design(u[s:s + chunk], v[s:s + chunk], order, exps)
+        zc = z[s:s + chunk]
+        Aw = A if coef is None else A * _robust_weights(r[s:s + chunk], scale, huber)
+        AtA += Aw @ A.T
+        Atb += Aw @ zc
+    return np.linalg.lstsq(AtA, Atb, rcond=None)[0], scale
+
+
+def _predict(u, v, coef, order, exps, chunk):
+    out = np.empty(len(u))
+    for s in range(0, len(u), chunk):
+        out[s:s + chunk] = coef @ _design(u[s:s + chunk], v[s:s + chunk], order, exps)
+    return out
+
+
+def fit_trend(x, y, z, order=1, robust=False, n_iter=15, chunk=CHUNK):
+    # Trend surface polinomial (regional) dengan least squares;
+    # robust = IRLS (Huber lalu Tukey bisquare, skala dari MAD residual)
+    ok = np.isfinite(x) & np.isfinite(y) & np.isfinite(z)
+    x, y, z = x[ok], y[ok], z[ok]
+    bounds = ((x.min(), x.max()), (y.min(), y.max()))
+    u = _normalize(x, bounds[0])
+    v = _normalize(y, bounds[1])
+    exps = _exponents(order)
+
+    coef, _ = _solve(u, v, z, order, exps, chunk)
+    if robust:
+        for it in range(n_iter):
+            huber = it < HUBER_ITER
+            new, scale = _solve(u, v, z, order, exps, chunk, coef, huber)
+            if scale == 0:
+                break
+            converged = not huber and np.allclose(new, coef, rtol=1e-6, atol=1e-9 * scale)
+            coef = new
+            if converged:
+                break
+    return {'order': order, 'coef': coef, 'bounds': bounds}
+
+
+def evaluate_points(trend, x, y, chunk=CHUNK):
+    exps = _exponents(trend['order'])
+    u = _normalize(x, trend['bounds'][0])
+    v = _normalize(y, trend['bounds'][1])
+    return _predict(u, v, trend['coef'], trend['order'], exps, chunk)
+
+
+def evaluate_grid(trend, xi_lin, yi_lin):
+    # Grid reguler: T = Vy @ C @ Vx^T, dengan C[j, i] = koefisien u^i v^j
+    order = trend['order']
+    C = np.zeros((order + 1, order + 1))
+    exps = _exponents(order)
+    C[exps[:, 1], exps[:, 0]] = trend['coef']
+    Vx = _powers(_normalize(xi_lin, trend['bounds'][0]), order)
+    Vy = _powers(_normalize(yi_lin, trend['bounds'][1]), order)
+    return Vy.T @ C @ Vx